@@ -0,0 +1,279 @@
+import os
+import uuid
+import asyncio
+from datetime import datetime, timedelta
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo import ReturnDocument
+from database import resume_collection, bump_corpus_version
+from calculation import analyze_resume_text_against_jd, extract_text_from_url, parse_pdf_bytes, tfidf_similarity
+from embeddings import embedding_record, encode_texts, bert_score
+from ai_feedback import generate_feedback
+from tfidf_model import index_resume
+from skill_taxonomy import get_taxonomy
+from ann_index import get_ann_index
+from workers import run_io_bound, run_cpu_bound, run_process_bound
+import text_cache
+
+load_dotenv()
+
+# Background analysis jobs for uploaded resumes.
+# The resume document itself is the job record (analysisStatus + jdText), so the queue needs no broker:
+# an in-process asyncio.Queue drained by ANALYSIS_WORKERS tasks, refilled from Mongo on startup
+# with anything left pending/running by a previous process.
+# Several server processes share the collection, so a job only runs once it has been claimed: an atomic
+# pending -> running update that stamps a claim id, which every later write of that run requires.
+# Whoever loses the claim drops the job. A running job is only taken back (reset to pending) once its
+# claim is older than ANALYSIS_LEASE_SECONDS, so a restarting process never re-runs its siblings' work.
+
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+ANALYSIS_LEASE_SECONDS = float(os.getenv("ANALYSIS_LEASE_SECONDS", "600"))
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_queue = None
+_worker_tasks = []
+# Uploaded PDF bytes waiting for their job, so the analysis never downloads a file we already have
+_pdf_bytes = {}
+# Resumes whose file never reached storage (uploadError) stay failed: jobs skip them and never overwrite that
+FILE_STORED = {"uploadError": {"$exists": False}}
+
+
+# Embed the resume text for reuse by /hr/top-matches and score it against the JD (CPU-bound)
+def score_and_embed_resume_text(resume_text, jd_text, tfidf_score=None):
+    result = score_and_embed_resume_texts([resume_text], jd_text, None if tfidf_score is None else [tfidf_score])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+# Batch version: every resume's chunks and the JD go through the model together.
+# Returns one (analysis, embedding) pair per resume, or the exception raised while scoring it.
+# tfidf_scores come from tfidf_scores_for() in the parent when this runs in a scoring worker process.
+def score_and_embed_resume_texts(resume_texts, jd_text, tfidf_scores=None):
+    vectors = encode_texts(list(resume_texts) + [jd_text])
+    jd_vector = vectors[-1]
+    results = []
+    for i, (resume_text, resume_vector) in enumerate(zip(resume_texts, vectors[:-1])):
+        try:
+            embedding = embedding_record(resume_text, resume_vector)
+            resume_bert_score = bert_score(resume_vector, jd_vector) if jd_text.strip() else 0.0
+            analysis = analyze_resume_text_against_jd(
+                resume_text, jd_text, bert_score=resume_bert_score,
+                tfidf_score=None if tfidf_scores is None else tfidf_scores[i]
+            )
+            results.append((analysis, embedding))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+# TF-IDF scores against the live corpus IDF; run here, not in a scoring worker (which never touches Mongo)
+def tfidf_scores_for(resume_texts, jd_text):
+    return [tfidf_similarity(resume_text, jd_text) for resume_text in resume_texts]
+
+
+# Uploaded PDF bytes -> text. Cache lookups stay in this process (shared LRU and Mongo tier);
+# only the parse runs in a worker process.
+async def extract_uploaded_text(pdf_bytes):
+    digest = text_cache.content_hash(pdf_bytes)
+    text = await run_io_bound(text_cache.get_by_hash, digest)
+    if text is None:
+        try:
+            text = await run_process_bound(parse_pdf_bytes, pdf_bytes)
+        except Exception as e:
+            raise Exception(f"Error extracting text from PDF: {str(e)}")
+        await run_io_bound(text_cache.store_text, digest, text)
+    return text
+
+
+# Fields written to the resume document once its analysis is done
+def analysis_fields(analysis, feedback, resume_text, embedding):
+    return {
+        "scores.skillScore": analysis["skillScore"],
+        "scores.tfidfScore": analysis["tfidfScore"],
+        "scores.bertScore": analysis["bertScore"],
+        "scores.hybridScore": analysis["hybridScore"],
+        "aiFeedback": feedback,
+        "resumeText": resume_text,
+        "embedding": embedding,
+        "resumeSkills": analysis["resumeSkills"],
+        "skillTaxonomyVersion": get_taxonomy().version,
+        "jdSkills": analysis["jdSkills"],
+        "matchedSkills": analysis["matchedSkills"],
+        "missingSkills": analysis["missingSkills"],
+        "analysisStatus": STATUS_DONE,
+        "analysisFinishedAt": datetime.utcnow(),
+        "corpusUpdatedAt": datetime.utcnow(),
+    }
+
+
+# Atomically take a pending job. Without the uploaded bytes in hand the file must already be stored;
+# an upload still in flight belongs to the process holding its bytes (unless it is older than the lease,
+# i.e. that process is gone, and the job then fails asking for a re-upload).
+def claim_job(resume_id, has_bytes):
+    query = {"_id": ObjectId(resume_id), "analysisStatus": STATUS_PENDING, **FILE_STORED}
+    if not has_bytes:
+        stale = datetime.utcnow() - timedelta(seconds=ANALYSIS_LEASE_SECONDS)
+        query["$or"] = [{"resumeUrl": {"$ne": None}}, {"uploadedAt": {"$lt": stale}}]
+    return resume_collection.find_one_and_update(
+        query,
+        {"$set": {
+            "analysisStatus": STATUS_RUNNING, "analysisStartedAt": datetime.utcnow(),
+            "analysisClaim": uuid.uuid4().hex,
+        }},
+        {"resumeUrl": 1, "jdText": 1, "analysisClaim": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def run_analysis_job(resume_id):
+    pdf_bytes = _pdf_bytes.pop(str(resume_id), None)
+    resume = await run_io_bound(claim_job, resume_id, pdf_bytes is not None)
+    if not resume:
+        print(f"⚠️ Analysis job for {resume_id} dropped (claimed elsewhere, finished, missing or unstored)")
+        return
+    claimed = {"_id": resume["_id"], "analysisClaim": resume["analysisClaim"], **FILE_STORED}
+
+    try:
+        if pdf_bytes is not None:
+            resume_text = await extract_uploaded_text(pdf_bytes)
+        elif resume.get("resumeUrl"):
+            # Drive links, and uploads re-queued after a restart
+            resume_text = await run_io_bound(extract_text_from_url, resume["resumeUrl"])
+        else:
+            raise Exception("Resume file is no longer available, please upload it again")
+        # Add the resume to the corpus TF-IDF model before scoring it with that model
+        await run_io_bound(index_resume, resume["_id"], resume_text)
+        jd_text = resume.get("jdText", "")
+        tfidf_score = (await run_io_bound(tfidf_scores_for, [resume_text], jd_text))[0]
+        analysis, embedding = await run_cpu_bound(score_and_embed_resume_text, resume_text, jd_text, tfidf_score)
+        feedback = generate_feedback(resume_text=resume_text, analysis_results=analysis)
+
+        # Update document with scores and feedback
+        result = await run_io_bound(
+            resume_collection.update_one,
+            claimed,
+            {"$set": analysis_fields(analysis, feedback, resume_text, embedding)},
+        )
+        if not result.matched_count:
+            print(f"⚠️ Analysis for {resume_id} finished after its claim was taken over, result discarded")
+            return
+        await run_io_bound(bump_corpus_version)
+        ann = get_ann_index()
+        if ann.enabled:
+            await run_io_bound(ann.add, resume["_id"], embedding["vector"], embedding["contentHash"])
+        print(f"✅ Analysis finished for resume {resume_id}")
+    except Exception as e:
+        print(f"❌ Error during resume analysis for {resume_id}: {str(e)}")
+        await run_io_bound(
+            resume_collection.update_one,
+            claimed,
+            {"$set": {
+                "analysisStatus": STATUS_FAILED, "analysisError": str(e),
+                "analysisFinishedAt": datetime.utcnow(), "corpusUpdatedAt": datetime.utcnow(),
+            }},
+        )
+
+
+async def _worker():
+    while True:
+        resume_id = await _queue.get()
+        try:
+            await run_analysis_job(resume_id)
+        except Exception as e:
+            print(f"❌ Analysis worker error for {resume_id}: {e}")
+        finally:
+            _queue.task_done()
+
+
+def enqueue(resume_id, pdf_bytes=None):
+    if pdf_bytes is not None:
+        _pdf_bytes[str(resume_id)] = pdf_bytes
+    _queue.put_nowait(str(resume_id))
+
+
+# The background upload to storage gave up: without a stored file the resume cannot be viewed or
+# re-analyzed after a restart, so fail it and ask for a re-upload
+def mark_upload_failed(resume_id, error):
+    _pdf_bytes.pop(str(resume_id), None)
+    resume_collection.update_one({"_id": ObjectId(resume_id)}, {"$set": {
+        "uploadError": str(error),
+        "analysisStatus": STATUS_FAILED,
+        "analysisError": "Resume file could not be stored, please upload it again",
+        "analysisFinishedAt": datetime.utcnow(),
+        "corpusUpdatedAt": datetime.utcnow(),
+    }})
+    bump_corpus_version()
+
+
+def queue_size():
+    return _queue.qsize() if _queue is not None else 0
+
+
+async def start():
+    global _queue
+    _queue = asyncio.Queue()
+    for _ in range(ANALYSIS_WORKERS):
+        _worker_tasks.append(asyncio.create_task(_worker()))
+
+    # Pick up jobs interrupted by a restart: running ones whose lease expired go back to pending, then
+    # every pending job is queued; other processes queue them too, and the claim lets one of them run it
+    released = await run_io_bound(release_expired_jobs)
+    unfinished = await run_io_bound(
+        lambda: list(resume_collection.find(
+            {"analysisStatus": STATUS_PENDING}, {"_id": 1}
+        ).sort("uploadedAt", 1))
+    )
+    for resume in unfinished:
+        enqueue(resume["_id"])
+    if unfinished:
+        print(f"🔁 Re-queued {len(unfinished)} unfinished analysis jobs ({released} with an expired lease)")
+
+
+def release_expired_jobs():
+    stale = datetime.utcnow() - timedelta(seconds=ANALYSIS_LEASE_SECONDS)
+    result = resume_collection.update_many(
+        {"analysisStatus": STATUS_RUNNING, "$or": [
+            {"analysisStartedAt": {"$lt": stale}}, {"analysisStartedAt": {"$exists": False}},
+        ]},
+        {"$set": {"analysisStatus": STATUS_PENDING}, "$unset": {"analysisClaim": ""}},
+    )
+    return result.modified_count
+
+
+async def stop():
+    for task in _worker_tasks:
+        task.cancel()
+    await asyncio.gather(*_worker_tasks, return_exceptions=True)
+    _worker_tasks.clear()
+
+
+# Shape returned by the status endpoint; matches the old synchronous upload response once done
+def serialize_job(doc):
+    status = doc.get("analysisStatus", STATUS_DONE)
+    result = {
+        "resumeId": str(doc["_id"]),
+        "status": status,
+        "resumeUrl": doc.get("resumeUrl"),
+        "driveUrl": doc.get("driveUrl") if doc.get("driveUrl") != "NULL" else "",
+    }
+    if status == STATUS_DONE:
+        scores = doc.get("scores", {})
+        result.update({
+            "resumeSkills": doc.get("resumeSkills", []),
+            "jdSkills": doc.get("jdSkills", []),
+            "matchedSkills": doc.get("matchedSkills", []),
+            "missingSkills": doc.get("missingSkills", []),
+            "skillScore": scores.get("skillScore"),
+            "tfidfScore": scores.get("tfidfScore"),
+            "bertScore": scores.get("bertScore"),
+            "hybridScore": scores.get("hybridScore"),
+            "aiFeedback": doc.get("aiFeedback", ""),
+        })
+    elif status == STATUS_FAILED:
+        result["error"] = doc.get("analysisError", "")
+    return result
@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import uuid
+import threading
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Approximate nearest-neighbour index over stored resume embeddings (unit vectors, inner product).
+# Used by ranking as a candidate-generation stage before exact hybrid re-scoring.
+#   ANN_BACKEND=auto  -> hnswlib if installed, otherwise the pure-NumPy IVF index below
+#   ANN_BACKEND=hnsw | ivf | off
+# The index is persisted under ANN_INDEX_DIR, updated incrementally as resumes are analyzed,
+# and caught up from Mongo (sync_from_db) on startup for anything other workers added.
+# Every worker process saves its own copy into the same directory, so a save never overwrites files
+# another process may be reading: the vectors go to a new file named for this save, then the manifest
+# (dim, ids, hashes and that file's name) is written to a temp file and os.replace'd into place.
+# Whichever manifest a reader sees names the vector file that was saved with it. Vector files no
+# manifest points to are removed once they are an hour old (left by other or exited processes).
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+BACKEND = os.getenv("ANN_BACKEND", "auto")
+INDEX_DIR = os.getenv("ANN_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ann_index"))
+SAVE_EVERY = int(os.getenv("ANN_SAVE_EVERY", "50"))
+IVF_NPROBE = int(os.getenv("ANN_IVF_NPROBE", "8"))
+HNSW_EF_SEARCH = int(os.getenv("ANN_HNSW_EF", "200"))
+ORPHAN_SECONDS = 3600
+
+
+# Inverted-file index: k-means centroids, each vector listed under its nearest centroid,
+# a query only scans the vectors under its nprobe closest centroids
+class IVFIndex:
+    name = "ivf"
+    min_train_size = 256
+
+    def __init__(self, dim, nprobe=IVF_NPROBE):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.size = 0
+        self._data = np.zeros((1024, dim), dtype=np.float32)
+        self._assignments = np.zeros(1024, dtype=np.int32)
+        self.centroids = None
+        self.trained_size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def vectors(self):
+        return self._data[:self.size]
+
+    @property
+    def assignments(self):
+        return self._assignments[:self.size]
+
+    def _train(self, iterations=10, seed=0):
+        vectors = self.vectors
+        nlist = max(1, int(np.sqrt(self.size)))
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(self.size, size=min(self.size, nlist * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            nearest = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[nearest == c]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    centroids[c] = centroid / (np.linalg.norm(centroid) or 1)
+        self.centroids = centroids
+        self._assignments[:self.size] = np.argmax(vectors @ centroids.T, axis=1)
+        self.trained_size = self.size
+
+    def set(self, label, vector):
+        if label >= len(self._data):
+            grow = max(len(self._data), label + 1)
+            self._data = np.vstack([self._data, np.zeros((grow, self.dim), dtype=np.float32)])
+            self._assignments = np.concatenate([self._assignments, np.zeros(grow, dtype=np.int32)])
+        self._data[label] = vector
+        self.size = max(self.size, label + 1)
+        if self.centroids is not None:
+            self._assignments[label] = int(np.argmax(self.centroids @ self._data[label]))
+        # (Re)train once there is enough data, and again whenever the index has doubled
+        if self.size >= self.min_train_size and self.size >= 2 * self.trained_size:
+            self._train()
+
+    def search(self, query, k):
+        if not self.size:
+            return np.zeros(0, dtype=np.int64)
+        if self.centroids is None:
+            rows = np.arange(self.size)
+        else:
+            probes = np.argsort(-(self.centroids @ query))[:self.nprobe]
+            rows = np.flatnonzero(np.isin(self.assignments, probes))
+        scores = self.vectors[rows] @ query
+        k = min(k, len(rows))
+        if not k:
+            return np.zeros(0, dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+        return rows[top[np.argsort(-scores[top])]]
+
+    def save(self, path):
+        np.savez(path + ".npz", vectors=self.vectors, assignments=self.assignments,
+                 centroids=self.centroids if self.centroids is not None else np.zeros((0, self.dim), dtype=np.float32),
+                 trained_size=self.trained_size)
+
+    @classmethod
+    def load(cls, path, dim):
+        data = np.load(path + ".npz")
+        index = cls(dim)
+        index.size = len(data["vectors"])
+        index._data = np.vstack([data["vectors"], np.zeros((max(1024, index.size), dim), dtype=np.float32)])
+        index._assignments = np.concatenate([data["assignments"], np.zeros(max(1024, index.size), dtype=np.int32)])
+        index.centroids = data["centroids"] if len(data["centroids"]) else None
+        index.trained_size = int(data["trained_size"])
+        return index
+
+
+class HNSWIndex:
+    name = "hnsw"
+
+    def __init__(self, dim, capacity=1024):
+        self.dim = dim
+        self.index = hnswlib.Index(space="ip", dim=dim)
+        self.index.init_index(max_elements=capacity, ef_construction=200, M=16)
+        self.index.set_ef(HNSW_EF_SEARCH)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def set(self, label, vector):
+        if label >= self.index.get_max_elements():
+            self.index.resize_index(max(1024, self.index.get_max_elements() * 2))
+        # Re-adding an existing label replaces its vector
+        self.index.add_items(np.asarray(vector, dtype=np.float32)[None, :], [label])
+        self.count = max(self.count, label + 1)
+
+    def search(self, query, k):
+        k = min(k, self.count)
+        if not k:
+            return np.zeros(0, dtype=np.int64)
+        self.index.set_ef(max(HNSW_EF_SEARCH, k))
+        labels, _ = self.index.knn_query(query, k=k)
+        return labels[0]
+
+    def save(self, path):
+        self.index.save_index(path + ".bin")
+
+    @classmethod
+    def load(cls, path, dim, count):
+        index = cls.__new__(cls)
+        index.dim = dim
+        index.index = hnswlib.Index(space="ip", dim=dim)
+        index.index.load_index(path + ".bin", max_elements=max(1024, count))
+        index.index.set_ef(HNSW_EF_SEARCH)
+        index.count = index.index.get_current_count()
+        return index
+
+
+def _backend_name():
+    if BACKEND == "auto":
+        return "hnsw" if hnswlib is not None else "ivf"
+    if BACKEND == "hnsw" and hnswlib is None:
+        print("⚠️ ANN_BACKEND=hnsw but hnswlib is not installed, using the NumPy IVF index")
+        return "ivf"
+    return BACKEND
+
+
+class ResumeANNIndex:
+    def __init__(self, directory=INDEX_DIR, backend=None):
+        self.directory = directory
+        self.backend = backend or _backend_name()
+        self.index = None
+        self.ids = []          # label -> resume id
+        self.labels = {}       # resume id -> label
+        self.hashes = {}       # resume id -> contentHash of the indexed embedding
+        self.unsaved = 0
+        self._saved_vectors = None  # vector file of this process's last save, removed by the next one
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.backend != "off"
+
+    def _path(self):
+        return os.path.join(self.directory, f"resumes.{self.backend}")
+
+    def load(self):
+        meta_path = self._path() + ".json"
+        if not os.path.exists(meta_path):
+            return False
+        with open(meta_path) as f:
+            meta = json.load(f)
+        # Manifests from before per-save vector files point at resumes.<backend>.npz/.bin
+        vectors_path = os.path.join(self.directory, meta["vectors"]) if "vectors" in meta else self._path()
+        if self.backend == "hnsw":
+            index = HNSWIndex.load(vectors_path, meta["dim"], len(meta["ids"]))
+        else:
+            index = IVFIndex.load(vectors_path, meta["dim"])
+        if len(index) != len(meta["ids"]):
+            raise ValueError(f"{len(index)} vectors for {len(meta['ids'])} resume ids")
+        with self._lock:
+            self.index = index
+            self.ids = meta["ids"]
+            self.hashes = meta["hashes"]
+            self.labels = {resume_id: label for label, resume_id in enumerate(self.ids)}
+        return True
+
+    def save(self):
+        if self.index is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            token = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+            vectors_path = f"{self._path()}.{token}"
+            self.index.save(vectors_path)
+            meta_path = self._path() + ".json"
+            with open(f"{meta_path}.{token}.tmp", "w") as f:
+                json.dump({
+                    "dim": self.index.dim, "ids": self.ids, "hashes": self.hashes,
+                    "vectors": os.path.basename(vectors_path),
+                }, f)
+            os.replace(f"{meta_path}.{token}.tmp", meta_path)
+            if self._saved_vectors is not None:
+                self._remove_vectors(self._saved_vectors)
+            self._saved_vectors = vectors_path
+            self._remove_orphans(os.path.basename(vectors_path))
+            self.unsaved = 0
+
+    def _remove_vectors(self, path):
+        for ext in (".npz", ".bin"):
+            try:
+                os.remove(path + ext)
+            except FileNotFoundError:
+                pass
+
+    def _remove_orphans(self, current):
+        prefix = os.path.basename(self._path()) + "."
+        cutoff = time.time() - ORPHAN_SECONDS
+        for name in os.listdir(self.directory):
+            if not name.startswith(prefix) or name.startswith(current) or name.endswith(".json"):
+                continue
+            try:
+                if os.path.getmtime(os.path.join(self.directory, name)) < cutoff:
+                    os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def add(self, resume_id, vector, content_hash=None, autosave=True):
+        resume_id = str(resume_id)
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            if self.index is None:
+                self.index = HNSWIndex(len(vector)) if self.backend == "hnsw" else IVFIndex(len(vector))
+            label = self.labels.get(resume_id)
+            if label is None:
+                label = len(self.ids)
+                self.ids.append(resume_id)
+                self.labels[resume_id] = label
+            self.index.set(label, vector)
+            self.hashes[resume_id] = content_hash
+            self.unsaved += 1
+            should_save = autosave and self.unsaved >= SAVE_EVERY
+        if should_save:
+            self.save()
+
+    # Resume ids of the k nearest stored embeddings
+    def search(self, query_vector, k):
+        if self.index is None:
+            return []
+        with self._lock:
+            labels = self.index.search(np.asarray(query_vector, dtype=np.float32), k)
+            return [self.ids[label] for label in labels]
+
+    # Add anything in Mongo that is missing from (or stale in) the index
+    def sync_from_db(self, resume_collection):
+        added = 0
+        cursor = resume_collection.find(
+            {"embedding.vector": {"$exists": True}},
+            {"embedding.vector": 1, "embedding.contentHash": 1},
+        )
+        for doc in cursor:
+            resume_id = str(doc["_id"])
+            content_hash = doc["embedding"].get("contentHash")
+            if self.hashes.get(resume_id) != content_hash:
+                self.add(resume_id, doc["embedding"]["vector"], content_hash, autosave=False)
+                added += 1
+        if added:
+            self.save()
+            print(f"🗂️ ANN index ({self.backend}) caught up with {added} resumes, {len(self.ids)} total")
+        return added
+
+
+# Fraction of the exact top-k found by the ANN top-k, averaged over the queries
+def recall_at_k(ann, vectors, ids, queries, k=10):
+    hits = 0
+    for query in queries:
+        exact = {ids[i] for i in np.argsort(-(vectors @ query))[:k]}
+        hits += len(exact & set(ann.search(query, k)))
+    return hits / (k * len(queries)) if len(queries) else 1.0
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_ann_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = ResumeANNIndex()
+                if index.enabled:
+                    try:
+                        index.load()
+                    except Exception as e:
+                        print(f"⚠️ Could not load ANN index, rebuilding: {e}")
+                        index = ResumeANNIndex()
+                _index = index
+    return _index
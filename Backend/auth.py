@@ -1,11 +1,10 @@
-from fastapi import APIRouter, HTTPException, Response, status, Request, Depends
-from passlib.hash import bcrypt
-from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Response, Depends
 from schemas import UserCreate, UserLogin, UserOut
-from jose import JWTError, jwt
-import os
 from utils import generate_token
-from database import collection
+from auth_utils import get_current_user, public_user, invalidate_user
+from pymongo.errors import DuplicateKeyError
+from database import get_async_db
+from passwords import hash_password, verify_password, needs_rehash
 
 router = APIRouter()
 
@@ -14,11 +13,11 @@ async def signup(user: UserCreate, res: Response):
     if len(user.password) < 6:
         raise HTTPException(status_code=400, detail="Password must be at least 6 characters")
 
-    existing_user = collection.find_one({"email": user.email})
+    existing_user = await get_async_db().user_data.find_one({"email": user.email}, {"_id": 1})
     if existing_user:
         raise HTTPException(status_code=400, detail="User already exists")
 
-    hashed_pw = bcrypt.hash(user.password)
+    hashed_pw = await hash_password(user.password)
 
     new_user = {
         "fullName": user.fullName,
@@ -26,10 +25,14 @@ async def signup(user: UserCreate, res: Response):
         "password": hashed_pw
     }
 
-    result = collection.insert_one(new_user)
+    try:
+        result = await get_async_db().user_data.insert_one(new_user)
+    except DuplicateKeyError:
+        # Concurrent signup with the same email, caught by the unique index
+        raise HTTPException(status_code=400, detail="User already exists")
     user_id = str(result.inserted_id)
 
-    token = generate_token(user_id)
+    token = generate_token(user_id, user.email, user.fullName)
     # Fix cookie settings for development
     res.set_cookie(
         key="jwt", 
@@ -49,11 +52,16 @@ async def signup(user: UserCreate, res: Response):
 
 @router.post("/login", response_model=UserOut)
 async def login(user: UserLogin, res: Response):
-    db_user = collection.find_one({"email": user.email})
-    if not db_user or not bcrypt.verify(user.password, db_user["password"]):
+    db_user = await get_async_db().user_data.find_one({"email": user.email}, {"password": 1, "fullName": 1, "email": 1})
+    if not db_user or not await verify_password(user.password, db_user["password"]):
         raise HTTPException(status_code=400, detail="The credentials are wrong")
 
-    token = generate_token(str(db_user["_id"]))
+    # Move hashes made with an older cost factor to BCRYPT_ROUNDS while the password is at hand
+    if needs_rehash(db_user["password"]):
+        new_hash = await hash_password(user.password)
+        await get_async_db().user_data.update_one({"_id": db_user["_id"]}, {"$set": {"password": new_hash}})
+
+    token = generate_token(str(db_user["_id"]), db_user["email"], db_user["fullName"])
     # Fix cookie settings for development
     res.set_cookie(
         key="jwt", 
@@ -64,11 +72,8 @@ async def login(user: UserLogin, res: Response):
         max_age=7*24*60*60
     )
 
-    return {
-        "_id": str(db_user["_id"]),
-        "fullName": db_user["fullName"],
-        "email": db_user["email"]
-    }
+    invalidate_user(db_user["_id"], db_user)
+    return public_user(db_user)
 
 @router.post("/logout")
 async def logout(res: Response):
@@ -76,35 +81,8 @@ async def logout(res: Response):
     return {"message": "Logout successful"}
 
 @router.get("/check-auth", response_model=UserOut)
-async def check_auth(request: Request):
-    token = request.cookies.get("jwt")
-    if not token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
-    try:
-        # Use a default secret key if not provided in environment
-        secret_key = os.getenv("JWT_SECRET", "your-secret-key-here-change-in-production")
-        payload = jwt.decode(token, secret_key, algorithms=["HS256"])
-        user_id = payload.get("user_id")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-        user = collection.find_one({"_id": ObjectId(user_id)})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        return {
-            "_id": str(user["_id"]),
-            "fullName": user["fullName"],
-            "email": user["email"]
-        }
-
-    except JWTError as e:
-        print(f"JWT Error: {e}")
-        raise HTTPException(status_code=401, detail="Token is invalid or expired")
-    except Exception as e:
-        print(f"Unexpected error in check_auth: {e}")
-        raise HTTPException(status_code=401, detail="Authentication error")
+async def check_auth(user=Depends(get_current_user)):
+    return user
     
 
 
@@ -3,6 +3,39 @@ from jose import jwt, JWTError
 from bson import ObjectId
 import os
 from database import collection  # your user collection
+from ttl_cache import TTLCache
+from utils import JWT_SECRET
+
+# The one auth dependency for every authenticated endpoint. Resolution order:
+#   1. in-process user cache (short TTL) - holds profiles refreshed via invalidate_user
+#   2. email/fullName claims carried in the token - no Mongo round trip
+#   3. Mongo lookup by user_id (tokens issued before the claims existed), then cached
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+def public_user(user):
+    return {
+        "_id": str(user["_id"]),
+        "fullName": user["fullName"],
+        "email": user["email"]
+    }
+
+def cache_user(user):
+    user = public_user(user)
+    user_cache.put(user["_id"], user)
+    return user
+
+# Call on profile changes: drops the cached profile, or replaces it when the new one is given.
+# A replaced entry also overrides (now stale) claims in tokens issued before the change.
+# There is no profile-update endpoint yet; login refreshes the entry from the stored document,
+# so a profile edited directly in Mongo is picked up at the user's next login.
+def invalidate_user(user_id, user=None):
+    if user is not None:
+        cache_user(user)
+    else:
+        user_cache.pop(str(user_id))
 
 def get_current_user(request: Request):
     token = request.cookies.get("jwt")
@@ -10,18 +43,21 @@ def get_current_user(request: Request):
         raise HTTPException(status_code=401, detail="Not authenticated")
 
     try:
-        payload = jwt.decode(token, os.getenv("JWT_SECRET"), algorithms=["HS256"])
-        user_id = payload.get("user_id")
+        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
 
-        user = collection.find_one({"_id": ObjectId(user_id)})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+    user_id = payload.get("user_id")
+    if not user_id or not ObjectId.is_valid(user_id):
+        raise HTTPException(status_code=401, detail="Invalid token")
 
-        return {
-            "_id": str(user["_id"]),
-            "fullName": user["fullName"],
-            "email": user["email"]
-        }
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+    if payload.get("email") and payload.get("fullName"):
+        return {"_id": user_id, "fullName": payload["fullName"], "email": payload["email"]}
 
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    user = collection.find_one({"_id": ObjectId(user_id)}, {"fullName": 1, "email": 1})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return cache_user(user)
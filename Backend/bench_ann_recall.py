@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Measure ANN recall@10 and query latency against the exact cosine scan
+Usage: python bench_ann_recall.py [--db]   (--db uses the stored resume embeddings)
+"""
+
+import sys
+import time
+import tempfile
+import numpy as np
+from ann_index import ResumeANNIndex, recall_at_k, hnswlib
+
+def synthetic_vectors(n=20000, dim=384, clusters=200, seed=0):
+    # Clustered unit vectors, roughly how resume embeddings group by role
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(0, clusters, size=n)] + rng.normal(scale=0.6, size=(n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+def stored_vectors():
+    from database import resume_collection
+    docs = list(resume_collection.find({"embedding.vector": {"$exists": True}}, {"embedding.vector": 1}))
+    return np.asarray([d["embedding"]["vector"] for d in docs], dtype=np.float32)
+
+def run_benchmark(vectors, queries=100, k=10):
+    ids = [str(i) for i in range(len(vectors))]
+    rng = np.random.default_rng(1)
+    picks = vectors[rng.integers(0, len(vectors), size=queries)]
+    query_vectors = picks + rng.normal(scale=0.05, size=picks.shape).astype(np.float32)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+
+    started = time.perf_counter()
+    for q in query_vectors:
+        np.argsort(-(vectors @ q))[:k]
+    exact_ms = (time.perf_counter() - started) / queries * 1000
+    print(f"📏 Exact scan: {exact_ms:.3f} ms/query over {len(vectors)} vectors")
+
+    for backend in ["ivf"] + (["hnsw"] if hnswlib is not None else []):
+        index = ResumeANNIndex(directory=tempfile.mkdtemp(), backend=backend)
+        started = time.perf_counter()
+        for resume_id, vector in zip(ids, vectors):
+            index.add(resume_id, vector, autosave=False)
+        build_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for q in query_vectors:
+            index.search(q, k)
+        ann_ms = (time.perf_counter() - started) / queries * 1000
+
+        recall = recall_at_k(index, vectors, ids, query_vectors, k)
+        print(f"✅ {backend}: recall@{k} = {recall:.3f}, {ann_ms:.3f} ms/query, build {build_s:.1f}s")
+
+if __name__ == "__main__":
+    print("🗂️ ANN RECALL BENCHMARK")
+    print("=" * 50)
+    vectors = stored_vectors() if "--db" in sys.argv else synthetic_vectors()
+    if len(vectors) == 0:
+        print("⚠️ No stored embeddings found")
+    else:
+        run_benchmark(vectors)
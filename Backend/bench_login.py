@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Login burst benchmark: bcrypt verify inline on the event loop vs on the bounded password pool
+Usage: python bench_login.py [--url http://localhost:8000 --email you@example.com --password ...]
+"""
+
+import sys
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import passwords
+from passwords import hasher, verify_password, BCRYPT_ROUNDS
+from workers import PASSWORD_WORKERS
+
+async def event_loop_lag(stop, samples):
+    # A healthy loop wakes up every ~10 ms; the overshoot is what other requests would wait
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        samples.append((time.perf_counter() - started - 0.01) * 1000)
+
+async def login_burst(verify, hashed, logins):
+    stop = asyncio.Event()
+    samples = []
+    monitor = asyncio.create_task(event_loop_lag(stop, samples))
+    await asyncio.sleep(0.02)
+    started = time.perf_counter()
+    await asyncio.gather(*(verify("correct horse", hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await monitor
+    return logins / elapsed, max(samples, default=0.0)
+
+async def inline_verify(password, hashed):
+    # What the old async endpoints did: block the loop for the whole hash
+    return hasher.verify(password, hashed)
+
+def run_in_process(logins):
+    hashed = hasher.hash("correct horse")
+    rate, lag = asyncio.run(login_burst(inline_verify, hashed, logins))
+    print(f"🐢 Inline on the event loop: {rate:.1f} logins/s, worst loop stall {lag:.0f} ms")
+    rate, lag = asyncio.run(login_burst(verify_password, hashed, logins))
+    print(f"✅ Password pool ({PASSWORD_WORKERS} workers): {rate:.1f} logins/s, worst loop stall {lag:.0f} ms")
+
+def run_against_server(url, email, password, logins, concurrency):
+    import requests
+
+    def login(_):
+        return requests.post(f"{url}/auth/login", json={"email": email, "password": password}).status_code
+
+    for workers in sorted({1, concurrency}):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            codes = list(pool.map(login, range(logins)))
+        elapsed = time.perf_counter() - started
+        print(f"🌐 {workers} concurrent clients: {logins / elapsed:.1f} logins/s, "
+              f"{codes.count(200)} ok, {codes.count(503)} shed, {len(codes) - codes.count(200) - codes.count(503)} failed")
+
+def arg(name, default=None):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+if __name__ == "__main__":
+    print("🔐 LOGIN THROUGHPUT BENCHMARK")
+    print("=" * 50)
+    print(f"⚙️ bcrypt rounds: {BCRYPT_ROUNDS}, password workers: {PASSWORD_WORKERS}, max pending: {passwords.PASSWORD_MAX_PENDING}")
+    logins = int(arg("--logins", str(passwords.PASSWORD_MAX_PENDING)))
+    if "--url" in sys.argv:
+        run_against_server(arg("--url"), arg("--email"), arg("--password"), logins, int(arg("--concurrency", "32")))
+    else:
+        run_in_process(logins)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Peak memory and time per resume download: buffered download + BytesIO + every page (old)
+vs streamed download with byte/page caps (extract_text_from_url)
+Usage: python bench_pdf_download.py [--pages 200]
+"""
+
+import os
+import sys
+import time
+import resource
+import tempfile
+import threading
+import subprocess
+from functools import partial
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+
+class PeakSampler(threading.Thread):
+    # ru_maxrss only ever grows, so sample the current RSS while the download runs
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.baseline = rss_mb()
+        self.peak = self.baseline
+        self.running = True
+
+    def run(self):
+        while self.running:
+            self.peak = max(self.peak, rss_mb())
+            time.sleep(0.002)
+
+    def stop(self):
+        self.running = False
+        self.join()
+        return max(self.peak, rss_mb()) - self.baseline
+
+def build_pdf(path, pages):
+    # Noise images do not compress, so the file is roughly 100 KB per page, like a scanned resume
+    import fitz
+    doc = fitz.open()
+    for i in range(pages):
+        noise = fitz.Pixmap(fitz.csRGB, 200, 170, os.urandom(200 * 170 * 3), False)
+        page = doc.new_page()
+        page.insert_text((50, 72), f"Page {i + 1}: Python developer with AWS, Docker and MongoDB experience")
+        page.insert_image(fitz.Rect(50, 100, 550, 525), pixmap=noise)
+    doc.save(path)
+
+def old_extract(url):
+    import requests
+    from io import BytesIO
+    import fitz
+    response = requests.get(url, timeout=30)
+    doc = fitz.open(stream=BytesIO(response.content), filetype="pdf")
+    return "\n".join(page.get_text() for page in doc)
+
+def new_extract(url):
+    from calculation import extract_text_from_url
+    return extract_text_from_url(url)
+
+def run_mode(mode, url):
+    import fitz, requests, calculation  # imports are not part of the measurement
+    sampler = PeakSampler()
+    sampler.start()
+    started = time.perf_counter()
+    try:
+        text = (old_extract if mode == "old" else new_extract)(url)
+        outcome = f"{len(text)} chars"
+    except Exception as e:
+        outcome = f"rejected ({e})"
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"{mode}|{sampler.stop():.1f}|{elapsed:.0f}|{outcome}")
+
+def serve(directory):
+    handler = partial(SimpleHTTPRequestHandler, directory=directory)
+    handler.log_message = lambda *args: None
+    server = HTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def measure(mode, url, env):
+    out = subprocess.run([sys.executable, __file__, "--mode", mode, url], capture_output=True, text=True, env=env).stdout
+    line = [l for l in out.splitlines() if l.startswith(mode + "|")][-1]
+    _, rss, ms, outcome = line.split("|", 3)
+    return float(rss), float(ms), outcome
+
+if __name__ == "__main__":
+    if "--mode" in sys.argv:
+        run_mode(sys.argv[sys.argv.index("--mode") + 1], sys.argv[-1])
+        sys.exit(0)
+
+    pages = int(sys.argv[sys.argv.index("--pages") + 1]) if "--pages" in sys.argv else 200
+    print("📥 PDF DOWNLOAD MEMORY BENCHMARK")
+    print("=" * 50)
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "resume.pdf")
+    build_pdf(path, pages)
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    server = serve(directory)
+    url = f"http://127.0.0.1:{server.server_port}/resume.pdf"
+    print(f"📄 {pages} pages, {size_mb:.1f} MB")
+
+    env = dict(os.environ, TEXT_CACHE_BACKEND="memory")
+    rss, ms, outcome = measure("old", url, env)
+    print(f"🐢 Buffered, all pages: +{rss:.1f} MB peak RSS, {ms:.0f} ms, {outcome}")
+    env["MAX_PDF_BYTES"] = str(int(os.path.getsize(path) * 2))
+    rss, ms, outcome = measure("new", url, env)
+    print(f"✅ Streamed, {os.getenv('MAX_PDF_PAGES', '20')}-page cap: +{rss:.1f} MB peak RSS, {ms:.0f} ms, {outcome}")
+    env["MAX_PDF_BYTES"] = str(int(os.path.getsize(path) // 4))
+    rss, ms, outcome = measure("new", url, env)
+    print(f"✅ Streamed, byte cap below file size: +{rss:.1f} MB peak RSS, {ms:.0f} ms, {outcome}")
+    server.shutdown()
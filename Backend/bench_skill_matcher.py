@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark skill extraction: phrase matcher vs the old full spaCy pipeline
+"""
+
+import time
+from skill_taxonomy import get_taxonomy
+from skill_matcher import SkillMatcher
+
+SAMPLE_RESUME = """
+Software engineer with 4 years of experience building web platforms in Python, Django and Flask.
+Designed REST APIs backed by MongoDB and SQL, deployed with Docker on AWS and Azure, Linux admin.
+Frontend work in React and Node.js; some C++ for performance-critical modules. Comfortable with Git,
+TensorFlow, Keras and PyTorch for ML prototypes. Known for communication, leadership, teamwork and
+problem-solving in cross-functional teams.
+""" * 20
+
+def time_per_call(func, runs):
+    started = time.perf_counter()
+    for _ in range(runs):
+        func()
+    return (time.perf_counter() - started) / runs * 1000
+
+def old_spacy_pipeline(nlp, text, keywords):
+    doc = nlp(text.lower())
+    return {token.text for token in doc if token.text in keywords}
+
+def run_benchmark(runs=50):
+    print("⏱️ SKILL EXTRACTION BENCHMARK")
+    print("=" * 50)
+    print(f"📄 Resume length: {len(SAMPLE_RESUME.split())} words")
+
+    taxonomy = get_taxonomy()
+    skill_keywords = taxonomy.skill_names
+    matcher = taxonomy.matcher
+    matcher_ms = time_per_call(lambda: matcher.match(SAMPLE_RESUME), runs)
+    print(f"✅ Phrase matcher (taxonomy {taxonomy.version}, {matcher.size} phrases): {matcher_ms:.3f} ms/resume")
+    print(f"   Found: {sorted(matcher.match(SAMPLE_RESUME))}")
+
+    # A taxonomy-sized dictionary should cost about the same per resume
+    big = SkillMatcher({f"skill {i} tool": () for i in range(20000)} | {s: () for s in skill_keywords})
+    big_ms = time_per_call(lambda: big.match(SAMPLE_RESUME), runs)
+    print(f"✅ Phrase matcher ({big.size} phrases): {big_ms:.3f} ms/resume")
+
+    try:
+        import spacy
+        nlp = spacy.load("en_core_web_sm")
+    except (ImportError, OSError):
+        print("⚠️ spaCy / en_core_web_sm not installed, skipping pipeline comparison")
+        return
+
+    spacy_ms = time_per_call(lambda: old_spacy_pipeline(nlp, SAMPLE_RESUME, skill_keywords), max(1, runs // 10))
+    print(f"🐢 Full spaCy pipeline: {spacy_ms:.3f} ms/resume")
+    print(f"📈 Speed-up: {spacy_ms / matcher_ms:.1f}x")
+
+if __name__ == "__main__":
+    run_benchmark()
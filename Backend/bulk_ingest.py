@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Bulk resume ingestion: many PDFs scored against one JD in a single batched pass.
+Used by POST /resume/bulk-upload and as a CLI:
+    python bulk_ingest.py <directory|archive.zip> --email recruiter@example.com --jd-file jd.txt
+"""
+
+import os
+import sys
+import posixpath
+import asyncio
+import zipfile
+from io import BytesIO
+from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from dotenv import load_dotenv
+from database import resume_collection, bump_corpus_version
+from calculation import parse_pdf_bytes, MAX_PDF_BYTES
+from utils import upload_pdf_to_cloudinary
+from ai_feedback import generate_feedback
+from tfidf_model import term_counts, get_tfidf_model
+from ann_index import get_ann_index
+from workers import run_io_bound, run_cpu_bound, run_process_bound
+import analysis_jobs
+
+load_dotenv()
+
+# Pipeline per batch:
+#   1. parse every PDF in the process pool (workers.run_process_bound)
+#   2. upload the parsed ones to Cloudinary, BULK_UPLOAD_CONCURRENCY at a time
+#   3. insert_many the resume documents (text + TF-IDF term counts), one df update for the batch
+#   4. encode all resumes and the JD in one model pass and score them (scoring pool)
+#   5. bulk_write the results
+# A failure at any step only fails that file; the response lists every file with its status.
+
+BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", "200"))
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "50"))
+BULK_UPLOAD_CONCURRENCY = int(os.getenv("BULK_UPLOAD_CONCURRENCY", "8"))
+
+
+# The path relative to the upload root (directory, ZIP or multipart filename), so same-named files in
+# different folders stay different candidates
+def candidate_id(email, filename):
+    path = posixpath.normpath(filename.replace("\\", "/")).lstrip("/")
+    return f"{email}/{path}"
+
+
+def check_pdf(data):
+    if not data.startswith(b"%PDF"):
+        raise Exception("Not a PDF file")
+    if len(data) > MAX_PDF_BYTES:
+        raise Exception(f"File larger than {MAX_PDF_BYTES} bytes")
+
+
+async def parse_file(filename, data):
+    check_pdf(data)
+    return await run_process_bound(parse_pdf_bytes, data)
+
+
+async def upload_file(data, limit):
+    async with limit:
+        return await run_io_bound(upload_pdf_to_cloudinary, BytesIO(data))
+
+
+def failed(item, error):
+    item.update({"status": analysis_jobs.STATUS_FAILED, "error": str(error)})
+
+
+# files: [(filename, pdf bytes)] -> one result dict per file, in order
+async def ingest_batch(files, email, jd_text):
+    items = [{"file": filename} for filename, _ in files]
+
+    texts = await asyncio.gather(*(parse_file(name, data) for name, data in files), return_exceptions=True)
+    parsed = []
+    for i, text in enumerate(texts):
+        if isinstance(text, Exception):
+            failed(items[i], text)
+        else:
+            parsed.append(i)
+
+    limit = asyncio.Semaphore(BULK_UPLOAD_CONCURRENCY)
+    urls = await asyncio.gather(*(upload_file(files[i][1], limit) for i in parsed), return_exceptions=True)
+    uploaded = []
+    for i, url in zip(parsed, urls):
+        if isinstance(url, Exception):
+            failed(items[i], url)
+        else:
+            items[i]["resumeUrl"] = url
+            uploaded.append(i)
+    if not uploaded:
+        return items
+
+    now = datetime.utcnow()
+    docs = []
+    for i in uploaded:
+        docs.append({
+            "email": email,
+            "candidateId": candidate_id(email, files[i][0]),
+            "resumeUrl": items[i]["resumeUrl"],
+            "driveUrl": "NULL",
+            "aiFeedback": "",
+            "scores": {"skillScore": None, "tfidfScore": None, "bertScore": None, "hybridScore": None},
+            "uploadedAt": now,
+            "jdText": jd_text,
+            "analysisStatus": analysis_jobs.STATUS_RUNNING,
+            "analysisStartedAt": now,
+            "resumeText": texts[i],
+            "tfidfTerms": term_counts(texts[i]),
+            "tfidfCounted": True,
+        })
+
+    # ordered=False: one bad document does not stop the rest of the batch
+    write_errors = {}
+    try:
+        await run_io_bound(resume_collection.insert_many, docs, ordered=False)
+    except BulkWriteError as e:
+        write_errors = {error["index"]: error["errmsg"] for error in e.details.get("writeErrors", [])}
+    inserted = []
+    for position, (i, doc) in enumerate(zip(uploaded, docs)):
+        if position in write_errors:
+            failed(items[i], write_errors[position])
+        else:
+            items[i]["resumeId"] = str(doc["_id"])
+            inserted.append((i, doc))
+    if not inserted:
+        return items
+
+    # Add the batch to the corpus TF-IDF model before scoring it with that model
+    await run_io_bound(get_tfidf_model().add_documents, [doc["tfidfTerms"] for _, doc in inserted])
+    await run_io_bound(bump_corpus_version)
+
+    try:
+        batch_texts = [texts[i] for i, _ in inserted]
+        tfidf_scores = await run_io_bound(analysis_jobs.tfidf_scores_for, batch_texts, jd_text)
+        results = await run_cpu_bound(analysis_jobs.score_and_embed_resume_texts, batch_texts, jd_text, tfidf_scores)
+    except Exception as e:
+        results = [e] * len(inserted)
+
+    updates = []
+    updated = []
+    embeddings = {}
+    for (i, doc), result in zip(inserted, results):
+        if isinstance(result, Exception):
+            failed(items[i], result)
+            updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": {
+                "analysisStatus": analysis_jobs.STATUS_FAILED, "analysisError": str(result),
+                "analysisFinishedAt": datetime.utcnow(), "corpusUpdatedAt": datetime.utcnow(),
+            }}))
+            updated.append(i)
+            continue
+        analysis, embedding = result
+        feedback = generate_feedback(resume_text=texts[i], analysis_results=analysis)
+        updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": analysis_jobs.analysis_fields(analysis, feedback, texts[i], embedding)}))
+        updated.append(i)
+        embeddings[i] = (doc["_id"], embedding)
+        items[i].update({"status": analysis_jobs.STATUS_DONE, "hybridScore": analysis["hybridScore"]})
+
+    # A result that could not be written fails its file. Its document stays "running", so the
+    # analysis queue takes it back once ANALYSIS_LEASE_SECONDS have passed (at the next start).
+    try:
+        await run_io_bound(resume_collection.bulk_write, updates, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            failed(items[updated[error["index"]]], error["errmsg"])
+            embeddings.pop(updated[error["index"]], None)
+    except Exception as e:
+        for i in updated:
+            failed(items[i], e)
+        embeddings.clear()
+    await run_io_bound(bump_corpus_version)
+
+    ann = get_ann_index()
+    if ann.enabled and embeddings:
+        for resume_id, embedding in embeddings.values():
+            await run_io_bound(ann.add, resume_id, embedding["vector"], embedding["contentHash"], False)
+        await run_io_bound(ann.save)
+    return items
+
+
+def summarize(items):
+    succeeded = sum(1 for item in items if item.get("status") == analysis_jobs.STATUS_DONE)
+    return {"total": len(items), "succeeded": succeeded, "failed": len(items) - succeeded, "items": items}
+
+
+# CLI input: (name, bytes) for every PDF under a directory or inside a ZIP, BULK_BATCH_SIZE at a time
+def iter_local_batches(path):
+    batch = []
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for name in sorted(archive.namelist()):
+                if name.lower().endswith(".pdf") and not name.endswith("/"):
+                    batch.append((name, archive.read(name)))
+                    if len(batch) == BULK_BATCH_SIZE:
+                        yield batch
+                        batch = []
+    else:
+        for root, _, names in sorted(os.walk(path)):
+            for name in sorted(names):
+                if name.lower().endswith(".pdf"):
+                    with open(os.path.join(root, name), "rb") as f:
+                        batch.append((os.path.relpath(os.path.join(root, name), path), f.read()))
+                    if len(batch) == BULK_BATCH_SIZE:
+                        yield batch
+                        batch = []
+    if batch:
+        yield batch
+
+
+async def ingest_path(path, email, jd_text):
+    items = []
+    for batch in iter_local_batches(path):
+        batch_items = await ingest_batch(batch, email, jd_text)
+        for item in batch_items:
+            if item.get("status") == analysis_jobs.STATUS_DONE:
+                print(f"✅ {item['file']}: {item['hybridScore']}")
+            else:
+                print(f"❌ {item['file']}: {item.get('error')}")
+        items += batch_items
+    return summarize(items)
+
+
+def arg(name, default=None):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or "--email" not in sys.argv or not ("--jd-file" in sys.argv or "--jd" in sys.argv):
+        print(__doc__)
+        sys.exit(1)
+    jd_text = open(arg("--jd-file"), encoding="utf-8").read() if "--jd-file" in sys.argv else arg("--jd")
+    print("📦 BULK RESUME INGESTION")
+    print("=" * 50)
+    summary = asyncio.run(ingest_path(sys.argv[1], arg("--email"), jd_text))
+    print(f"📊 {summary['succeeded']} analyzed, {summary['failed']} failed, {summary['total']} total")
@@ -1,58 +1,114 @@
-import spacy
+import os
 import requests
-from io import BytesIO
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import fitz  # PyMuPDF
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer, util
+import text_cache
+from skill_matcher import get_skill_matcher
+from skill_taxonomy import get_taxonomy
 
-# Load spaCy NLP model
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    print("⚠️ spaCy model not found. Please run: python -m spacy download en_core_web_sm")
-    nlp = None
+# Bounds on a single resume: larger downloads are aborted mid-stream, pages past the cap are never parsed
+MAX_PDF_BYTES = int(os.getenv("MAX_PDF_BYTES", str(10 * 1024 * 1024)))
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "20"))
+PDF_HTTP_POOL_SIZE = int(os.getenv("PDF_HTTP_POOL_SIZE", "20"))
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
 
-# Load BERT model
-bert_model = SentenceTransformer('all-MiniLM-L6-v2')
+# One keep-alive connection pool per host (Cloudinary, Drive) shared by all downloads
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(
+    pool_connections=4, pool_maxsize=PDF_HTTP_POOL_SIZE,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+))
+http_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=PDF_HTTP_POOL_SIZE))
 
-# Extract text from PDF URL
+# PDF bytes -> text of the first max_pages pages; a plain top-level function so it can also run in a process pool
+def parse_pdf_bytes(data, max_pages=MAX_PDF_PAGES):
+    # A memoryview is read in place; fitz would copy a bytearray (or BytesIO) into new bytes first
+    with fitz.open(stream=memoryview(data), filetype="pdf") as doc:
+        text = "\n".join(doc[i].get_text() for i in range(min(len(doc), max_pages)))
+    if not text.strip():
+        raise Exception("PDF appears to be empty or unreadable")
+    return text
+
+# Stream the body into one buffer, giving up as soon as it passes MAX_PDF_BYTES
+def download_pdf(pdf_url, headers=None):
+    with http_session.get(pdf_url, timeout=30, headers=headers, stream=True) as response:
+        if response.status_code != 200:
+            return response.status_code, None, response.headers
+        declared = int(response.headers.get("Content-Length") or 0)
+        if declared > MAX_PDF_BYTES:
+            raise Exception(f"PDF is larger than {MAX_PDF_BYTES} bytes")
+
+        if declared and not response.headers.get("Content-Encoding"):
+            # Known size: read straight from the socket into one preallocated buffer
+            data = bytearray(declared)
+            view = memoryview(data)
+            filled = 0
+            while filled < declared:
+                n = response.raw.readinto(view[filled:filled + DOWNLOAD_CHUNK_BYTES])
+                if not n:
+                    raise Exception("Connection closed before the PDF was fully downloaded")
+                filled += n
+            return response.status_code, data, response.headers
+
+        data = bytearray()
+        for chunk in response.iter_content(DOWNLOAD_CHUNK_BYTES):
+            data += chunk
+            if len(data) > MAX_PDF_BYTES:
+                raise Exception(f"PDF is larger than {MAX_PDF_BYTES} bytes")
+        return response.status_code, data, response.headers
+
+# Extract text from PDF URL (repeat calls are served from text_cache)
 def extract_text_from_url(pdf_url):
     try:
-        response = requests.get(pdf_url, timeout=30)
-        if response.status_code != 200:
-            raise Exception(f"Failed to download PDF: HTTP {response.status_code}")
-        
-        pdf_stream = BytesIO(response.content)
-        doc = fitz.open(stream=pdf_stream, filetype="pdf")
-        text = "\n".join(page.get_text() for page in doc)
-        
-        if not text.strip():
-            raise Exception("PDF appears to be empty or unreadable")
-            
+        cached_text = text_cache.lookup_fresh(pdf_url)
+        if cached_text is not None:
+            return cached_text
+
+        status, data, headers = download_pdf(pdf_url, text_cache.conditional_headers(pdf_url))
+        if status == 304:
+            cached_text = text_cache.revalidated(pdf_url)
+            if cached_text is not None:
+                return cached_text
+            status, data, headers = download_pdf(pdf_url)
+        if status != 200:
+            raise Exception(f"Failed to download PDF: HTTP {status}")
+
+        digest = text_cache.content_hash(data)
+        text = text_cache.get_by_hash(digest)
+        if text is None:
+            text = parse_pdf_bytes(data)
+
+        text_cache.store(pdf_url, digest, text, headers.get("ETag"))
         return text
     except Exception as e:
         raise Exception(f"Error extracting text from PDF: {str(e)}")
 
-# Extract skills from text
-def extract_skills(text, skill_keywords):
-    if not nlp:
-        text_lower = text.lower()
-        return {skill for skill in skill_keywords if skill.lower() in text_lower}
-    
+# Extract skills from text (phrase matcher: handles "problem solving", "node.js", "c++")
+# With no explicit keyword set the current skill taxonomy (skill_taxonomy.json) is used
+def extract_skills(text, skill_keywords=None):
     try:
-        doc = nlp(text.lower())
-        return {token.text for token in doc if token.text in skill_keywords}
+        if skill_keywords is None:
+            return get_taxonomy().match(text)
+        return get_skill_matcher(skill_keywords).match(text)
     except Exception as e:
         print(f"⚠️ Error in skill extraction: {e}")
         text_lower = text.lower()
-        return {skill for skill in skill_keywords if skill.lower() in text_lower}
+        return {skill for skill in (skill_keywords or ()) if skill.lower() in text_lower}
 
-# TF-IDF similarity
+# TF-IDF similarity, weighted by IDF over the whole stored resume corpus (see tfidf_model)
 def tfidf_similarity(text1, text2):
     try:
         if not text1.strip() or not text2.strip():
             return 0.0
+        from tfidf_model import get_tfidf_model
+        model = get_tfidf_model()
+        if model.n_docs:
+            return model.similarity(text1, text2) * 100
+
+        # Empty corpus (fresh install): fall back to fitting on the pair
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.metrics.pairwise import cosine_similarity
         vectorizer = TfidfVectorizer()
         vectors = vectorizer.fit_transform([text1, text2])
         cosine_sim = cosine_similarity(vectors[0:1], vectors[1:2])[0][0]
@@ -66,8 +122,10 @@ def bert_similarity(text1, text2):
     try:
         if not text1.strip() or not text2.strip():
             return 0.0
-        embeddings = bert_model.encode([text1, text2], convert_to_tensor=True)
-        similarity = util.pytorch_cos_sim(embeddings[0], embeddings[1]).item()
+        # Chunked + pooled so the whole of a long resume is covered, not just the first 256 tokens
+        from embeddings import encode_texts
+        embeddings = encode_texts([text1, text2])
+        similarity = float(embeddings[0] @ embeddings[1])
         return similarity * 100
     except Exception as e:
         print(f"⚠️ Error in BERT similarity: {e}")
@@ -92,44 +150,51 @@ def hybrid_score(skill_score, tfidf_score, bert_score, weights=(0.4, 0.3, 0.3)):
         print(f"⚠️ Error in hybrid scoring: {e}")
         return 0.0
 
-# Predefined skill keywords (shortened here for brevity; use full list in production)
-skill_keywords = {
-    "python", "java", "c++", "sql", "react", "node.js", "django", "flask", "html", "css",
-    "tensorflow", "keras", "pytorch", "mongodb", "git", "docker", "aws", "azure", "linux",
-    "communication", "leadership", "problem solving", "teamwork"
-}
+# 🔍 Score already-extracted resume text against a JD
+def analyze_resume_text_against_jd(resume_text, jd_text, bert_score=None, tfidf_score=None):
+    resume_skills = extract_skills(resume_text)
+    jd_skills = extract_skills(jd_text)
+    # Scoring worker processes get the TF-IDF score from the parent, which holds the live corpus IDF
+    if tfidf_score is None:
+        tfidf_score = tfidf_similarity(resume_text, jd_text)
+    # Callers holding a stored resume embedding pass the BERT score in directly
+    if bert_score is None:
+        bert_score = bert_similarity(resume_text, jd_text)
+    return analysis_result(resume_skills, jd_skills, tfidf_score, bert_score)
+
+# Analysis shape shared by every scoring path, from the skill sets and the two similarity scores
+def analysis_result(resume_skills, jd_skills, tfidf_score, bert_score):
+    skill_score = skill_match_score(resume_skills, jd_skills)
+    final_score = hybrid_score(skill_score, tfidf_score, bert_score)
+
+    return {
+        "resumeSkills": sorted(resume_skills),
+        "jdSkills": sorted(jd_skills),
+        "matchedSkills": sorted(resume_skills & jd_skills),
+        "missingSkills": sorted(jd_skills - resume_skills),
+        "skillScore": round(skill_score, 2),
+        "tfidfScore": round(tfidf_score, 2),
+        "bertScore": round(bert_score, 2),
+        "hybridScore": final_score
+    }
+
+def empty_analysis():
+    return {
+        "resumeSkills": [],
+        "jdSkills": [],
+        "matchedSkills": [],
+        "missingSkills": [],
+        "skillScore": 0.0,
+        "tfidfScore": 0.0,
+        "bertScore": 0.0,
+        "hybridScore": 0.0
+    }
 
 # 🔍 Main analysis function
 def analyze_resume_against_jd(resume_url, jd_text):
     try:
         resume_text = extract_text_from_url(resume_url)
-        resume_skills = extract_skills(resume_text, skill_keywords)
-        jd_skills = extract_skills(jd_text, skill_keywords)
-
-        skill_score = skill_match_score(resume_skills, jd_skills)
-        tfidf_score = tfidf_similarity(resume_text, jd_text)
-        bert_score = bert_similarity(resume_text, jd_text)
-        final_score = hybrid_score(skill_score, tfidf_score, bert_score)
-
-        return {
-            "resumeSkills": sorted(resume_skills),
-            "jdSkills": sorted(jd_skills),
-            "matchedSkills": sorted(resume_skills & jd_skills),
-            "missingSkills": sorted(jd_skills - resume_skills),
-            "skillScore": round(skill_score, 2),
-            "tfidfScore": round(tfidf_score, 2),
-            "bertScore": round(bert_score, 2),
-            "hybridScore": final_score
-        }
+        return analyze_resume_text_against_jd(resume_text, jd_text)
     except Exception as e:
         print(f"❌ Error in resume analysis: {str(e)}")
-        return {
-            "resumeSkills": [],
-            "jdSkills": [],
-            "matchedSkills": [],
-            "missingSkills": [],
-            "skillScore": 0.0,
-            "tfidfScore": 0.0,
-            "bertScore": 0.0,
-            "hybridScore": 0.0
-        }
+        return empty_analysis()
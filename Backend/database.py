@@ -1,11 +1,223 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING, DESCENDING, monitoring
+from pymongo.errors import OperationFailure
+from fastapi.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 import os
+import threading
 
 load_dotenv()
 MONGO_URI = os.getenv("MONGODB_URI")
+DB_NAME = "resume_db"
 
-client = MongoClient(MONGO_URI)
-db = client.resume_db
+# One pool per process, shared by the sync client (threadpool routes, workers) and sized separately
+# for the async client (async routes). MONGODB_URI=mongomock:// runs against an in-memory stand-in.
+MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+ASYNC_MAX_POOL_SIZE = int(os.getenv("MONGO_ASYNC_MAX_POOL_SIZE", str(MAX_POOL_SIZE)))
+# How long a request waits for a free pooled connection before failing, instead of queueing forever
+WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000"))
+RETRY_WRITES = os.getenv("MONGO_RETRY_WRITES", "true").lower() == "true"
+RETRY_READS = os.getenv("MONGO_RETRY_READS", "true").lower() == "true"
+
+
+def client_options(max_pool_size=MAX_POOL_SIZE):
+    return {
+        "maxPoolSize": max_pool_size,
+        "minPoolSize": MIN_POOL_SIZE,
+        "waitQueueTimeoutMS": WAIT_QUEUE_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": CONNECT_TIMEOUT_MS,
+        "retryWrites": RETRY_WRITES,
+        "retryReads": RETRY_READS,
+    }
+
+
+# Connection pool counters from pymongo's CMAP events, per client
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self.open = 0
+        self.created = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+        self._lock = threading.Lock()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+            self.created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def snapshot(self):
+        return {
+            "open": self.open,
+            "created": self.created,
+            "checkedOut": self.checked_out,
+            "maxCheckedOut": self.max_checked_out,
+            "checkouts": self.checkouts,
+            "checkoutFailures": self.checkout_failures,
+            "poolClears": self.pool_clears,
+        }
+
+
+sync_pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
+
+def using_mongomock(uri=MONGO_URI):
+    return bool(uri) and uri.startswith("mongomock://")
+
+
+def create_client(uri=MONGO_URI):
+    if using_mongomock(uri):
+        import mongomock
+        return mongomock.MongoClient()
+    return MongoClient(uri, event_listeners=[sync_pool_metrics], **client_options())
+
+
+client = create_client()
+db = client[DB_NAME]
 collection = db["user_data"]
-resume_collection = db.resumes
\ No newline at end of file
+resume_collection = db.resumes
+corpus_meta = db.corpus_meta
+
+# Monotonic version of the resume corpus; bumped on every resume insert/update so caches
+# (ranking matrices, HR query results) can tell they are stale without scanning the collection
+def bump_corpus_version():
+    corpus_meta.update_one({"_id": "resumes"}, {"$inc": {"version": 1}}, upsert=True)
+
+def get_corpus_version():
+    doc = corpus_meta.find_one({"_id": "resumes"}) or {}
+    return doc.get("version", 0)
+
+# Indexes the queries rely on: (collection, keys, options)
+#   users by email (login/signup, unique), a user's resumes in (hybridScore, _id) keyset order (listing),
+#   unfinished analysis jobs by upload time (re-queue on startup), recently changed resumes (HR corpus sync)
+INDEXES = [
+    (collection, [("email", ASCENDING)], {"name": "email_unique", "unique": True}),
+    (resume_collection, [("email", ASCENDING), ("scores.hybridScore", DESCENDING), ("_id", DESCENDING)], {"name": "email_hybridScore_id"}),
+    (resume_collection, [("analysisStatus", ASCENDING), ("uploadedAt", ASCENDING)], {"name": "analysisStatus_uploadedAt"}),
+    (resume_collection, [("corpusUpdatedAt", ASCENDING)], {"name": "corpusUpdatedAt"}),
+]
+
+# create_index is a no-op when the index already exists, so this is safe to run on every startup
+def ensure_indexes():
+    for target, keys, options in INDEXES:
+        try:
+            target.create_index(keys, **options)
+        except OperationFailure as e:
+            # e.g. duplicate emails already stored - keep serving, but say why the index is missing
+            print(f"⚠️ Could not create index {options['name']} on {target.name}: {e}")
+
+
+# Awaitable stand-in for a motor database over the mongomock client: collection methods run
+# in the threadpool. Covers single-call methods (find_one, insert_one, update_one, count_documents...)
+class ThreadedDatabase:
+    class Collection:
+        def __init__(self, collection):
+            self._collection = collection
+
+        def __getattr__(self, name):
+            method = getattr(self._collection, name)
+
+            async def call(*args, **kwargs):
+                return await run_in_threadpool(method, *args, **kwargs)
+            return call
+
+    def __init__(self, database):
+        self._database = database
+
+    def __getitem__(self, name):
+        return ThreadedDatabase.Collection(self._database[name])
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+async_client = None
+async_db = None
+
+
+# Motor database for async routes; created by startup() inside the running event loop
+def get_async_db():
+    if async_db is None:
+        raise RuntimeError("Async Mongo client is not started; database.startup() runs on app startup")
+    return async_db
+
+
+async def startup():
+    global async_client, async_db
+    if using_mongomock():
+        async_db = ThreadedDatabase(db)
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        async_client = AsyncIOMotorClient(
+            MONGO_URI, event_listeners=[async_pool_metrics], **client_options(ASYNC_MAX_POOL_SIZE)
+        )
+        async_db = async_client[DB_NAME]
+    try:
+        await run_in_threadpool(client.admin.command, "ping")
+        print(f"🍃 MongoDB connected (pool max {MAX_POOL_SIZE}, async pool max {ASYNC_MAX_POOL_SIZE})")
+    except Exception as e:
+        # Keep starting: requests fail fast (serverSelectionTimeoutMS) until Mongo is reachable
+        print(f"⚠️ MongoDB not reachable at startup: {e}")
+        return
+    await run_in_threadpool(ensure_indexes)
+
+
+async def shutdown():
+    global async_client, async_db
+    if async_client is not None:
+        async_client.close()
+    async_client = async_db = None
+    client.close()
+
+
+def pool_stats():
+    return {
+        "options": client_options(),
+        "asyncMaxPoolSize": ASYNC_MAX_POOL_SIZE,
+        "sync": sync_pool_metrics.snapshot(),
+        "async": async_pool_metrics.snapshot(),
+        "asyncStarted": async_db is not None,
+    }
@@ -0,0 +1,104 @@
+import os
+import hashlib
+import numpy as np
+from dotenv import load_dotenv
+from model_registry import get_bert_model, BERT_MODEL_NAME
+
+load_dotenv()
+
+# Resume embeddings are stored on the resume document as
+#   "embedding": {"model": ..., "pooling": ..., "contentHash": ..., "vector": [...]}
+# so a JD query only has to encode the JD and do one matrix-vector product.
+#
+# MiniLM only sees max_seq_length word pieces, so long documents are split into token-bounded
+# chunks, all chunks of all documents go through the model in large batches, and the chunk
+# vectors are pooled back into one unit-length vector per document.
+
+EMBEDDING_POOLING = os.getenv("EMBEDDING_POOLING", "mean")  # "mean" or "max"
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("EMBEDDING_CHUNK_OVERLAP", "32"))
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+# Split text into pieces of at most max_seq_length word pieces (minus [CLS]/[SEP]), slicing the original string
+def chunk_text(text, max_tokens=None, overlap=CHUNK_OVERLAP_TOKENS):
+    model = get_bert_model()
+    max_tokens = max_tokens or model.max_seq_length - 2
+    encoding = model.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+    offsets = encoding["offset_mapping"]
+    if len(offsets) <= max_tokens:
+        return [text]
+
+    step = max(1, max_tokens - overlap)
+    chunks = []
+    for start in range(0, len(offsets), step):
+        window = offsets[start:start + max_tokens]
+        chunks.append(text[window[0][0]:window[-1][1]])
+        if start + max_tokens >= len(offsets):
+            break
+    return chunks
+
+def _pool(chunk_vectors, owners, count, pooling):
+    dim = chunk_vectors.shape[1]
+    if pooling == "max":
+        pooled = np.full((count, dim), -np.inf, dtype=np.float32)
+        np.maximum.at(pooled, owners, chunk_vectors)
+    else:
+        pooled = np.zeros((count, dim), dtype=np.float32)
+        np.add.at(pooled, owners, chunk_vectors)
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    return pooled / np.where(norms == 0, 1, norms)
+
+# Encode many documents into an (n x d) matrix of unit-length vectors (dot product == cosine)
+def encode_texts(texts, pooling=EMBEDDING_POOLING, batch_size=EMBEDDING_BATCH_SIZE):
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    chunks, owners = [], []
+    for i, text in enumerate(texts):
+        for chunk in chunk_text(text):
+            chunks.append(chunk)
+            owners.append(i)
+    chunk_vectors = get_bert_model().encode(
+        chunks, batch_size=batch_size, normalize_embeddings=True, convert_to_numpy=True
+    ).astype(np.float32)
+    return _pool(chunk_vectors, np.asarray(owners), len(texts), pooling)
+
+def encode_text(text):
+    return encode_texts([text])[0]
+
+def embedding_record(resume_text, vector):
+    return {
+        "model": BERT_MODEL_NAME,
+        "pooling": EMBEDDING_POOLING,
+        "contentHash": content_hash(resume_text),
+        "vector": vector.tolist(),
+    }
+
+def build_embedding_record(resume_text):
+    return embedding_record(resume_text, encode_text(resume_text))
+
+def build_embedding_records(resume_texts):
+    vectors = encode_texts(resume_texts)
+    return [embedding_record(text, vector) for text, vector in zip(resume_texts, vectors)]
+
+# A stored embedding is reusable only if it came from the current model/pooling and the current text.
+# Documents read without resumeText (the HR corpus listing) trust the hash written alongside the text.
+def get_stored_vector(doc):
+    record = doc.get("embedding")
+    if not record:
+        return None
+    if record.get("model") != BERT_MODEL_NAME or record.get("pooling") != EMBEDDING_POOLING:
+        return None
+    if "resumeText" in doc and (not doc["resumeText"] or record.get("contentHash") != content_hash(doc["resumeText"])):
+        return None
+    return np.asarray(record["vector"], dtype=np.float32)
+
+# BERT score (0-100) of every row in `matrix` against one JD vector
+def bert_scores(matrix, jd_vector):
+    if len(matrix) == 0:
+        return np.zeros(0, dtype=np.float32)
+    return (np.asarray(matrix, dtype=np.float32) @ jd_vector) * 100
+
+def bert_score(resume_vector, jd_vector):
+    return float(np.dot(resume_vector, jd_vector) * 100)
@@ -1,14 +1,58 @@
-from fastapi import APIRouter, HTTPException, Query, Request, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Form
 from database import resume_collection
+from auth_utils import get_current_user
+from scoring_engine import engine as scoring_engine
+import analysis_jobs
+import rescoring
 from datetime import datetime
 from bson import ObjectId
-from typing import List
-from jose import JWTError, jwt
+from typing import Optional
 import os
+import json
+import base64
 
 router = APIRouter()
 
-def serialize_resume(doc):
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Most resumes one /resumes/score call compares (best stored score first)
+MAX_SCORED_RESUMES = int(os.getenv("MAX_SCORED_RESUMES", "200"))
+
+# Only the fields serialize_resume reads; resumeText and embeddings are never sent to listings
+RESUME_LIST_PROJECTION = {
+    "email": 1, "resumeUrl": 1, "driveUrl": 1, "aiFeedback": 1, "scores": 1, "uploadedAt": 1, "analysisStatus": 1
+}
+# Summary mode drops the feedback blob, by far the largest field
+RESUME_SUMMARY_PROJECTION = {field: 1 for field in RESUME_LIST_PROJECTION if field != "aiFeedback"}
+RESUME_SORT = [("scores.hybridScore", -1), ("_id", -1)]
+
+# Served by the {email: 1, scores.hybridScore: -1, _id: -1} index: no collection scan, no in-memory sort
+def find_resumes_for_email(email, query=None, projection=RESUME_LIST_PROJECTION):
+    return resume_collection.find({"email": email, **(query or {})}, projection).sort(RESUME_SORT)
+
+# Keyset cursor: the (hybridScore, _id) of the last resume on the previous page
+def encode_resume_cursor(doc):
+    key = {"score": (doc.get("scores") or {}).get("hybridScore"), "id": str(doc["_id"])}
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+
+def decode_resume_cursor(cursor):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return key["score"], ObjectId(key["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# Everything after (score, id) in (hybridScore desc, _id desc) order; unscored resumes sort last
+def after_cursor(score, resume_id):
+    if score is None:
+        return {"scores.hybridScore": None, "_id": {"$lt": resume_id}}
+    return {"$or": [
+        {"scores.hybridScore": {"$lt": score}},
+        {"scores.hybridScore": score, "_id": {"$lt": resume_id}},
+        {"scores.hybridScore": None},
+    ]}
+
+def serialize_resume(doc, summary=False):
     feedback = doc.get("aiFeedback", "")
     
     # Handle different feedback formats
@@ -25,7 +69,7 @@ def serialize_resume(doc):
         # Fallback to empty list
         feedback = []
 
-    return {
+    serialized = {
         "id": str(doc.get("_id")),
         "email": doc.get("email"),
         "resumeUrl": doc.get("resumeUrl"),
@@ -37,13 +81,17 @@ def serialize_resume(doc):
             "bertScore": None,
             "hybridScore": None
         }),
-        "uploadedAt": doc.get("uploadedAt", datetime.utcnow()).isoformat()
+        "uploadedAt": doc.get("uploadedAt", datetime.utcnow()).isoformat(),
+        "analysisStatus": doc.get("analysisStatus", "done")
     }
+    if summary:
+        del serialized["aiFeedback"]
+    return serialized
 
 @router.get("/")
 def get_resumes_for_email(email: str = Query(..., description="User email to fetch resumes")):
     try:
-        resumes_cursor = resume_collection.find({"email": email}).sort("scores.hybridScore", -1)
+        resumes_cursor = find_resumes_for_email(email)
         resumes = list(resumes_cursor)
 
         if not resumes:
@@ -59,30 +107,86 @@ def get_resumes_for_email(email: str = Query(..., description="User email to fet
         raise HTTPException(status_code=500, detail=f"Error fetching resumes: {str(e)}")
 
 @router.get("/resumes")
-def get_resumes_for_authenticated_user(request: Request):
-    token = request.cookies.get("jwt")
-    if not token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
+def get_resumes_for_authenticated_user(
+    user=Depends(get_current_user),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="nextCursor from the previous page"),
+    fields: str = Query("full", pattern="^(full|summary)$", description="summary omits aiFeedback")
+):
+    email = user["email"]
+    query = after_cursor(*decode_resume_cursor(cursor)) if cursor else None
+    summary = fields == "summary"
     try:
-        secret_key = os.getenv("JWT_SECRET", "your-secret-key-here-change-in-production")
-        payload = jwt.decode(token, secret_key, algorithms=["HS256"])
-        user_id = payload.get("user_id")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        # Find user email by user_id
-        from database import collection
-        user = collection.find_one({"_id": ObjectId(user_id)})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        email = user["email"]
-        resumes_cursor = resume_collection.find({"email": email}).sort("scores.hybridScore", -1)
-        resumes = list(resumes_cursor)
+        # One extra document tells whether another page exists
+        resumes = list(find_resumes_for_email(
+            email, query, RESUME_SUMMARY_PROJECTION if summary else RESUME_LIST_PROJECTION
+        ).limit(limit + 1))
+        has_more = len(resumes) > limit
+        resumes = resumes[:limit]
         return {
             "email": email,
             "count": len(resumes),
-            "resumes": [serialize_resume(resume) for resume in resumes]
+            "resumes": [serialize_resume(resume, summary) for resume in resumes],
+            "hasMore": has_more,
+            "nextCursor": encode_resume_cursor(resumes[-1]) if has_more else None
         }
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Token is invalid or expired")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching resumes: {str(e)}")
+
+# Every analyzed resume of the user against one JD, ranked; nothing is written back.
+# Past MAX_SCORED_RESUMES only the best-scored ones (by stored score) are re-scored; `truncated` and
+# `total` say so.
+def score_resumes_for_email(email, jd_text):
+    query = {"analysisStatus": {"$nin": [analysis_jobs.STATUS_PENDING, analysis_jobs.STATUS_RUNNING]}}
+    resumes = list(find_resumes_for_email(
+        email, query, {**rescoring.RESCORE_PROJECTION, "uploadedAt": 1, "driveUrl": 1}
+    ).limit(MAX_SCORED_RESUMES + 1))
+    truncated = len(resumes) > MAX_SCORED_RESUMES
+    resumes = resumes[:MAX_SCORED_RESUMES]
+    total = resume_collection.count_documents({"email": email, **query}) if truncated else len(resumes)
+    analyses, elapsed_ms = rescoring.rescore_resumes(resumes, jd_text)
+
+    ranked = []
+    for resume, analysis in zip(resumes, analyses):
+        if analysis is None:
+            continue
+        ranked.append({
+            "id": str(resume["_id"]),
+            "resumeUrl": resume.get("resumeUrl"),
+            "driveUrl": resume.get("driveUrl"),
+            "uploadedAt": resume.get("uploadedAt", datetime.utcnow()).isoformat(),
+            **analysis,
+        })
+    ranked.sort(key=lambda item: item["hybridScore"], reverse=True)
+    return {
+        "email": email,
+        "count": len(ranked),
+        "skipped": len(resumes) - len(ranked),
+        "total": total,
+        "truncated": truncated,
+        "resumes": ranked,
+        "elapsedMs": elapsed_ms,
+    }
+
+@router.post("/resumes/score")
+async def score_resumes_against_jd(jd_text: str = Form(...), user=Depends(get_current_user)):
+    try:
+        # One batched pass on the scoring engine's threads (429 when the scoring queue is full)
+        return await scoring_engine.run_local(score_resumes_for_email, user["email"], jd_text)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error scoring resumes: {str(e)}")
+
+@router.get("/resumes/{resume_id}")
+def get_resume_detail(resume_id: str, user=Depends(get_current_user)):
+    email = user["email"]
+    if not ObjectId.is_valid(resume_id):
+        raise HTTPException(status_code=404, detail="Resume not found")
+    try:
+        resume = resume_collection.find_one({"_id": ObjectId(resume_id), "email": email}, RESUME_LIST_PROJECTION)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching resume: {str(e)}")
+    if not resume:
+        raise HTTPException(status_code=404, detail="Resume not found")
+    return serialize_resume(resume)
@@ -1,58 +1,173 @@
+import json
+import time
+import base64
+import numpy as np
+from datetime import datetime, timezone
 from fastapi import APIRouter, Form, HTTPException
-from database import resume_collection
-from calculation import extract_text_from_url, analyze_resume_against_jd
-from bson import ObjectId
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from ranking import get_resume_corpus, RERANK_CANDIDATES
+from query_cache import result_cache, result_key, get_jd_features
+from embeddings import encode_text
+from scoring_engine import engine as scoring_engine
 
 router = APIRouter()
 
+MAX_PAGE_SIZE = 100
+# Rankings are computed (and cached) this many results deep at a time, so paging through a
+# query only re-ranks every few pages instead of on every request
+PAGE_DEPTH_STEP = 50
+
+
+def encode_cursor(offset):
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset}).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        offset = int(json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))["offset"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset
+
+
+def parse_date(value, name):
+    if not value:
+        return None
+    try:
+        d = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}, expected an ISO date")
+    # uploadedAt is stored as naive UTC
+    if d.tzinfo is not None:
+        d = d.astimezone(timezone.utc).replace(tzinfo=None)
+    return d
+
+
+# Comma-separated skills -> canonical taxonomy names (aliases allowed); None if any is unknown
+def canonical_skills(required_skills, taxonomy):
+    canonical = set()
+    for name in filter(None, (s.strip() for s in (required_skills or "").split(","))):
+        matched = taxonomy.match(name)
+        if not matched:
+            return None
+        canonical |= matched
+    return sorted(canonical)
+
+
+def stream_matches(corpus, jd_text, jd_features, rows, offset, limit, min_score):
+    # One NDJSON line per scored chunk with the best-so-far page, then a final line
+    started = time.perf_counter()
+    results = []
+    for scored, ranked in corpus.iter_top_matches(jd_text, k=offset + limit, jd_features=jd_features, rows=rows, min_score=min_score):
+        results = ranked[offset:]
+        yield json.dumps({"type": "progress", "scored": scored, "total": int(len(rows)), "topResumes": results}) + "\n"
+    yield json.dumps({
+        "type": "result",
+        "count": len(results),
+        "topResumes": results,
+        "corpusSize": corpus.size,
+        "filteredSize": int(len(rows)),
+        "elapsedMs": round((time.perf_counter() - started) * 1000, 2),
+    }) + "\n"
+
+
 @router.post("/top-matches")
-async def get_top_matching_resumes(jd_text: str = Form(...)):
+async def get_top_matching_resumes(
+    jd_text: str = Form(...),
+    candidates: Optional[int] = Form(None),
+    limit: int = Form(10),
+    offset: int = Form(0),
+    cursor: Optional[str] = Form(None),
+    min_score: Optional[float] = Form(None),
+    required_skills: Optional[str] = Form(None),
+    uploaded_after: Optional[str] = Form(None),
+    uploaded_before: Optional[str] = Form(None),
+    stream: bool = Form(False)
+):
+    # Ranks the in-memory corpus, so it runs in-process on the scoring engine's threads (429 when full)
+    result = await scoring_engine.run_local(
+        match_resumes, jd_text, candidates, limit, offset, cursor, min_score,
+        required_skills, uploaded_after, uploaded_before, stream
+    )
+    if stream:
+        return StreamingResponse(engine_stream(result), media_type="application/x-ndjson")
+    return result
+
+
+# The scoring happens as the stream is read: every chunk is scored on the engine's threads and counts
+# toward its queue depth. Only the request itself is shed; a stream that has started is not cut off.
+async def engine_stream(lines):
+    while True:
+        line = await scoring_engine.run_local(next, lines, None, shed=False)
+        if line is None:
+            return
+        yield line
+
+
+def match_resumes(jd_text, candidates, limit, offset, cursor, min_score,
+                  required_skills, uploaded_after, uploaded_before, stream):
+    limit = min(max(1, limit), MAX_PAGE_SIZE)
+    offset = decode_cursor(cursor) if cursor else max(0, offset)
+    after = parse_date(uploaded_after, "uploaded_after")
+    before = parse_date(uploaded_before, "uploaded_before")
+
     try:
-        resumes = list(resume_collection.find({}, {"resumeUrl": 1, "email": 1, "_id": 1}))
-        if not resumes:
+        started = time.perf_counter()
+        corpus = get_resume_corpus()
+        load_ms = round((time.perf_counter() - started) * 1000, 2)
+        if not corpus.size:
             raise HTTPException(status_code=404, detail="No resumes available in database.")
 
-        email_to_best_resume = {}
-
-        for resume in resumes:
-            try:
-                resume_url = resume["resumeUrl"]
-                email = resume["email"]
-
-                # Analyze resume against JD
-                analysis = analyze_resume_against_jd(resume_url=resume_url, jd_text=jd_text)
-
-                current_resume_data = {
-                    "resumeId": str(resume["_id"]),
-                    "email": email,
-                    "resumeUrl": resume_url,
-                    "matchedSkills": analysis["matchedSkills"],
-                    "scores": {
-                        "skillScore": analysis["skillScore"],
-                        "tfidfScore": analysis["tfidfScore"],
-                        "bertScore": analysis["bertScore"],
-                        "hybridScore": analysis["hybridScore"]
-                    }
-                }
-
-                # If email not in dict or this resume has a better score, store it
-                if email not in email_to_best_resume or \
-                   analysis["hybridScore"] > email_to_best_resume[email]["scores"]["hybridScore"]:
-                    email_to_best_resume[email] = current_resume_data
-
-            except Exception as e:
-                print(f"⚠️ Skipping resume {resume.get('_id')}: {e}")
-                continue
-
-        # Extract values and sort by hybridScore descending
-        top_resumes = sorted(email_to_best_resume.values(), key=lambda x: x["scores"]["hybridScore"], reverse=True)[:10]
+        # Filters are applied before scoring, so filtered-out resumes are never scored
+        skills = canonical_skills(required_skills, corpus.taxonomy)
+        rows = corpus.filter_rows(skills, after, before) if skills is not None else np.zeros(0, dtype=np.int64)
+        jd_features = get_jd_features(jd_text, corpus.taxonomy, encode_text)
+
+        if stream:
+            return stream_matches(corpus, jd_text, jd_features, rows, offset, limit, min_score)
+
+        candidates = RERANK_CANDIDATES if candidates is None else max(0, candidates)
+        depth = -(-(offset + limit) // PAGE_DEPTH_STEP) * PAGE_DEPTH_STEP
+        key = result_key(
+            jd_text, corpus.signature[1], corpus.taxonomy.version, k=depth, candidates=candidates,
+            min_score=min_score, skills=None if skills is None else tuple(skills),
+            after=after, before=before
+        )
+        cached = result_cache.get(key)
+        if cached is not None:
+            ranked, stats = cached
+            stats = {**stats, "timings": {"loadCorpus": load_ms, "cacheHit": round((time.perf_counter() - started) * 1000, 2)}}
+        else:
+            # Cheap retrieve stage over the filtered corpus, full hybrid re-score of the candidates, best resume per email
+            ranked, stats = corpus.top_matches(
+                jd_text, k=depth, candidates=candidates, jd_features=jd_features, rows=rows, min_score=min_score
+            )
+            result_cache.put(key, (ranked, stats))
+            stats = {**stats, "timings": {"loadCorpus": load_ms, **stats["timings"]}}
 
+        top_resumes = ranked[offset:offset + limit]
+        # A full-depth ranking may continue past its last element; a short one is exhausted
+        has_more = len(ranked) > offset + limit or len(ranked) == depth
         return {
             "message": "Top matching resumes retrieved",
             "jd": jd_text,
             "count": len(top_resumes),
-            "topResumes": top_resumes
+            "topResumes": top_resumes,
+            "offset": offset,
+            "limit": limit,
+            "hasMore": has_more,
+            "nextCursor": encode_cursor(offset + limit) if has_more else None,
+            "corpusSize": stats["corpusSize"],
+            "filteredSize": stats["filteredSize"],
+            "candidateCount": stats["candidateCount"],
+            "timings": stats["timings"],
+            "cached": cached is not None
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error matching resumes: {str(e)}")
@@ -4,6 +4,15 @@ from auth import router as auth_router
 from getData import router as data_router
 from hr_matches import router as hr_router
 from uploads import router as resume_router
+import workers
+import analysis_jobs
+import model_registry
+import ann_index
+import query_cache
+import scoring_engine
+import database
+from database import resume_collection
+from workers import run_io_bound
 
 app = FastAPI()
 
@@ -11,6 +20,9 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
+# Optional eager model load (PRELOAD_MODELS); at import time so `gunicorn --preload` shares it across workers
+model_registry.warm_up_from_env()
+
 # CORS for frontend communication
 app.add_middleware(
     CORSMiddleware,
@@ -24,6 +36,31 @@ app.add_middleware(
 async def root():
     return {"message": "Resume Analyzer Backend is running!"}
 
+@app.on_event("startup")
+async def connect_database():
+    await database.startup()
+
+@app.on_event("startup")
+async def start_scoring_engine():
+    await scoring_engine.engine.start()
+
+@app.on_event("startup")
+async def start_analysis_jobs():
+    await analysis_jobs.start()
+
+@app.on_event("startup")
+async def load_ann_index():
+    index = ann_index.get_ann_index()
+    if index.enabled:
+        await run_io_bound(index.sync_from_db, resume_collection)
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    await analysis_jobs.stop()
+    ann_index.get_ann_index().save()
+    workers.shutdown()
+    await database.shutdown()
+
 @app.get("/health")
 async def health_check():
     return {
@@ -32,6 +69,22 @@ async def health_check():
         "jwt_secret_configured": bool(os.getenv("JWT_SECRET"))
     }
 
+@app.get("/health/models")
+async def model_health():
+    return model_registry.model_stats()
+
+@app.get("/health/db")
+async def database_health():
+    return database.pool_stats()
+
+@app.get("/health/scoring")
+async def scoring_health():
+    return scoring_engine.engine.stats()
+
+@app.get("/health/caches")
+async def cache_health():
+    return query_cache.cache_stats()
+
 app.include_router(auth_router, prefix="/auth")
 app.include_router(resume_router,prefix="/resume")
 app.include_router(data_router, prefix="/getme")
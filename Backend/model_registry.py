@@ -0,0 +1,80 @@
+import os
+import time
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Lazily loaded NLP models shared by the whole process.
+# Nothing heavy is imported until a model is first requested, so auth-only workers and scripts
+# start fast. Set PRELOAD_MODELS=bert (or "all") to load them up front instead; main.py does
+# this at import time, so under `gunicorn --preload` the master loads them once and forked workers
+# share the pages copy-on-write.
+
+BERT_MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+def _load_bert():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(BERT_MODEL_NAME)
+
+
+_loaders = {
+    "bert": _load_bert,
+}
+
+_models = {}
+_stats = {}
+_lock = threading.Lock()
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def get_model(name):
+    if name in _models:
+        return _models[name]
+    with _lock:
+        if name not in _models:
+            rss_before = _rss_mb()
+            started = time.perf_counter()
+            _models[name] = _loaders[name]()
+            _stats[name] = {
+                "loaded": _models[name] is not None,
+                "loadSeconds": round(time.perf_counter() - started, 3),
+                "rssDeltaMb": round(_rss_mb() - rss_before, 1),
+                "pid": os.getpid(),
+            }
+            print(f"🧠 Loaded {name} model in {_stats[name]['loadSeconds']}s (+{_stats[name]['rssDeltaMb']} MB)")
+    return _models[name]
+
+
+def get_bert_model():
+    return get_model("bert")
+
+
+def warm_up(names=None):
+    for name in names or _loaders:
+        get_model(name)
+
+
+def warm_up_from_env():
+    preload = os.getenv("PRELOAD_MODELS", "").strip()
+    if not preload:
+        return
+    names = None if preload == "all" else [n.strip() for n in preload.split(",") if n.strip()]
+    warm_up(names)
+
+
+def model_stats():
+    return {
+        "loaded": dict(_stats),
+        "available": sorted(_loaders),
+        "rssMb": round(_rss_mb(), 1),
+    }
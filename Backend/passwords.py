@@ -0,0 +1,51 @@
+import os
+from fastapi import HTTPException
+from passlib.hash import bcrypt
+from dotenv import load_dotenv
+from workers import run_password_bound, PASSWORD_WORKERS
+
+load_dotenv()
+
+# bcrypt off the event loop, on the bounded password pool (workers.run_password_bound).
+#   BCRYPT_ROUNDS        cost factor for new hashes; stored hashes with another cost are
+#                        re-hashed on the next successful login (needs_rehash)
+#   PASSWORD_MAX_PENDING hashes allowed in flight or queued; beyond that requests get a 503
+#                        instead of piling up behind a burst of logins
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", str(PASSWORD_WORKERS * 16)))
+
+hasher = bcrypt.using(rounds=BCRYPT_ROUNDS)
+_pending = 0
+
+
+async def _run_bounded(func, *args):
+    # Only touched from the event loop thread, so a plain counter is enough
+    global _pending
+    if _pending >= PASSWORD_MAX_PENDING:
+        raise HTTPException(status_code=503, detail="Too many authentication requests, please retry", headers={"Retry-After": "1"})
+    _pending += 1
+    try:
+        return await run_password_bound(func, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password):
+    return await _run_bounded(hasher.hash, password)
+
+
+async def verify_password(password, hashed):
+    return await _run_bounded(hasher.verify, password, hashed)
+
+
+# "$2b$<rounds>$<salt+checksum>"
+def needs_rehash(hashed):
+    try:
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
+def pending():
+    return _pending
@@ -0,0 +1,52 @@
+import os
+import re
+import hashlib
+from dotenv import load_dotenv
+from ttl_cache import TTLCache
+
+load_dotenv()
+
+# Caches for repeated /hr/top-matches queries.
+#   jd features: normalized JD hash + taxonomy version -> {"skills", "vector"}; reused by any query with
+#                the same JD (different page, filters or candidate count), so the JD is encoded once
+#   results:     JD hash + corpus version + taxonomy version + query options -> ranked list and stats;
+#                a resume insert/update bumps the corpus version, so stale rankings are never served
+# Both are in-process LRUs with a TTL.
+
+JD_CACHE_SIZE = int(os.getenv("JD_CACHE_SIZE", "512"))
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "900"))
+
+
+jd_cache = TTLCache(JD_CACHE_SIZE, CACHE_TTL)
+result_cache = TTLCache(RESULT_CACHE_SIZE, CACHE_TTL)
+
+
+# Case and whitespace never change the score (tokenizers lowercase, TF-IDF ignores spacing)
+def normalize_jd(jd_text):
+    return re.sub(r"\s+", " ", jd_text).strip().lower()
+
+
+def jd_hash(jd_text):
+    return hashlib.sha256(normalize_jd(jd_text).encode("utf-8")).hexdigest()
+
+
+def result_key(jd_text, corpus_version, taxonomy_version, **options):
+    return (jd_hash(jd_text), corpus_version, taxonomy_version, tuple(sorted(options.items())))
+
+
+# JD skills and embedding, computed once per normalized JD and taxonomy version
+def get_jd_features(jd_text, taxonomy, encode):
+    key = (jd_hash(jd_text), taxonomy.version)
+    features = jd_cache.get(key)
+    if features is None:
+        features = {
+            "skills": taxonomy.match(jd_text),
+            "vector": encode(jd_text) if jd_text.strip() else None,
+        }
+        jd_cache.put(key, features)
+    return features
+
+
+def cache_stats():
+    return {"jd": jd_cache.stats(), "results": result_cache.stats()}
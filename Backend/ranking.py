@@ -0,0 +1,477 @@
+import os
+import copy
+import time
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+from scipy import sparse
+from database import resume_collection, bump_corpus_version, get_corpus_version
+from calculation import extract_text_from_url
+from skill_taxonomy import get_taxonomy
+from embeddings import build_embedding_records, get_stored_vector, encode_text, bert_scores
+from tfidf_model import get_tfidf_model, index_resume, counts_matrix
+from ann_index import get_ann_index
+from analysis_jobs import STATUS_PENDING, STATUS_RUNNING
+
+# Batched ranking engine for /hr/top-matches.
+# The corpus is turned into three matrices once (skills bit-matrix, TF-IDF, embeddings)
+# and a JD is scored with one sparse/dense product per component: a cheap skill + TF-IDF pass over
+# everything picks candidates, and only those are re-scored with BERT.
+# After the first build only resumes written since the last sync (corpusUpdatedAt) are read back:
+# a changed resume's old row is marked dead and the new version appended, and the corpus is rebuilt
+# from scratch only when the taxonomy changes or dead rows pass CORPUS_MAX_DEAD_FRACTION.
+
+DEFAULT_WEIGHTS = (0.4, 0.3, 0.3)
+
+# Above ANN_MIN_CORPUS resumes, only the ANN_CANDIDATES nearest embeddings are re-scored exactly
+ANN_MIN_CORPUS = int(os.getenv("ANN_MIN_CORPUS", "5000"))
+ANN_CANDIDATES = int(os.getenv("ANN_CANDIDATES", "500"))
+# Resumes kept by the cheap skill + TF-IDF stage for the full hybrid re-score (0 = all)
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "1000"))
+# Rows scored between two progress lines in streaming mode
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "5000"))
+# Incremental syncs re-read this far back, for writes still in flight and clock skew between workers
+CORPUS_SYNC_OVERLAP_SECONDS = float(os.getenv("CORPUS_SYNC_OVERLAP_SECONDS", "60"))
+CORPUS_MAX_DEAD_FRACTION = float(os.getenv("CORPUS_MAX_DEAD_FRACTION", "0.2"))
+
+# resumeText is left out: it is only read for the few resumes whose stored artifacts are stale
+CORPUS_PROJECTION = {
+    "resumeUrl": 1, "email": 1, "embedding": 1, "resumeSkills": 1, "skillTaxonomyVersion": 1,
+    "tfidfTerms": 1, "uploadedAt": 1, "candidateId": 1, "analysisStatus": 1, "corpusUpdatedAt": 1,
+}
+# Resumes still being analyzed have no artifacts yet; their analysis job stamps them when done
+CORPUS_QUERY = {"analysisStatus": {"$nin": [STATUS_PENDING, STATUS_RUNNING]}}
+
+
+def in_corpus(resume):
+    return resume.get("analysisStatus") not in (STATUS_PENDING, STATUS_RUNNING)
+
+
+# Make sure every resume has its text, TF-IDF term counts, a current embedding and skills extracted with
+# the current taxonomy version stored, computing only what is missing or stale; all stale resumes are
+# embedded together in one batched encode. A taxonomy change only re-runs the (cheap) skill matcher.
+# Resumes read without resumeText get it fetched only if something has to be recomputed.
+# Returns one vector per resume (None where the resume could not be processed).
+def backfill_resume_artifacts(resumes, taxonomy):
+    vectors = [get_stored_vector(resume) for resume in resumes]
+
+    def is_stale(i):
+        resume = resumes[i]
+        return (vectors[i] is None or resume.get("tfidfTerms") is None or resume.get("resumeSkills") is None
+                or resume.get("skillTaxonomyVersion") != taxonomy.version)
+
+    missing_text = [i for i in range(len(resumes)) if "resumeText" not in resumes[i] and is_stale(i)]
+    if missing_text:
+        texts = {doc["_id"]: doc.get("resumeText") for doc in resume_collection.find(
+            {"_id": {"$in": [resumes[i]["_id"] for i in missing_text]}}, {"resumeText": 1}
+        )}
+        for i in missing_text:
+            resumes[i]["resumeText"] = texts.get(resumes[i]["_id"])
+            # Now checked against the text it was computed from
+            vectors[i] = get_stored_vector(resumes[i])
+
+    changed = False
+    stale = []
+    for i, resume in enumerate(resumes):
+        if vectors[i] is not None:
+            continue
+        try:
+            resume["resumeText"] = resume.get("resumeText") or extract_text_from_url(resume["resumeUrl"])
+            stale.append(i)
+        except Exception as e:
+            print(f"⚠️ Skipping resume {resume.get('_id')}: {e}")
+
+    if stale:
+        changed = True
+        records = build_embedding_records([resumes[i]["resumeText"] for i in stale])
+        for i, embedding in zip(stale, records):
+            resumes[i]["embedding"] = embedding
+            resume_collection.update_one(
+                {"_id": resumes[i]["_id"]},
+                {"$set": {"resumeText": resumes[i]["resumeText"], "embedding": embedding}},
+            )
+            vectors[i] = np.asarray(embedding["vector"], dtype=np.float32)
+            if get_ann_index().enabled:
+                get_ann_index().add(resumes[i]["_id"], vectors[i], embedding["contentHash"])
+
+    for resume, vector in zip(resumes, vectors):
+        if vector is None:
+            continue
+        if resume.get("resumeSkills") is None or resume.get("skillTaxonomyVersion") != taxonomy.version:
+            resume["resumeSkills"] = sorted(taxonomy.match(resume["resumeText"]))
+            resume["skillTaxonomyVersion"] = taxonomy.version
+            resume_collection.update_one(
+                {"_id": resume["_id"]},
+                {"$set": {"resumeSkills": resume["resumeSkills"], "skillTaxonomyVersion": taxonomy.version}},
+            )
+            changed = True
+        if resume.get("tfidfTerms") is None:
+            resume["tfidfTerms"] = index_resume(resume["_id"], resume["resumeText"])
+            changed = True
+    if changed:
+        bump_corpus_version()
+    return vectors
+
+
+class ResumeCorpus:
+    def __init__(self, resumes, taxonomy):
+        self.taxonomy = taxonomy
+        self.ids = []
+        self.emails = []
+        self.urls = []
+        self.skills = []
+        # str(resume id) -> live row, and the corpusUpdatedAt that row was read at
+        self.row_of = {}
+        self.updated_at = {}
+        # Rows ever appended (n_rows) vs resumes currently in the corpus (size); the difference is dead rows
+        self.n_rows = 0
+        self.size = 0
+        self.alive = np.zeros(0, dtype=bool)
+        self.signature = None
+        self.synced_at = None
+
+        # Skills: N x S bit-matrix over the skill vocabulary
+        self.skill_vocab = {skill: i for i, skill in enumerate(sorted(taxonomy.skill_names))}
+        self.skill_matrix = sparse.csr_matrix((0, len(self.skill_vocab)), dtype=np.float32)
+
+        # TF-IDF: raw term counts; IDF weights and row norms are applied at query time with the current
+        # corpus IDF (tfidf_weights), so rows appended later never need re-weighting
+        self.tfidf_vocab = {}
+        self.tf_matrix = sparse.csr_matrix((0, 0), dtype=np.float64)
+        self._tfidf_key = None
+        self._tfidf_weights = None
+
+        # BERT: unit-length embeddings in a buffer with spare capacity, so appends do not copy the corpus
+        self._embeddings = np.zeros((0, 0), dtype=np.float32)
+
+        # Upload dates for pushed-down range filters (missing dates never match a range)
+        self.uploaded_at = np.zeros(0, dtype="datetime64[ms]")
+
+        # Integer group per candidate so the best resume per candidate can be picked without a Python loop
+        self.candidate_codes = {}
+        self.email_codes = np.zeros(0, dtype=np.int64)
+
+        self._append(resumes)
+
+    @property
+    def embedding_matrix(self):
+        return self._embeddings[:self.n_rows]
+
+    def live_rows(self):
+        return np.flatnonzero(self.alive)
+
+    def _append(self, resumes):
+        resumes = [resume for resume in resumes if in_corpus(resume)]
+        skills = []
+        candidate_keys = []
+        uploaded_at = []
+        term_counts = []
+        vectors = []
+        for resume, vector in zip(resumes, backfill_resume_artifacts(resumes, self.taxonomy)):
+            if vector is None or not resume.get("email"):
+                continue
+            vectors.append(vector)
+            resume_id = str(resume["_id"])
+            self.row_of[resume_id] = self.n_rows + len(vectors) - 1
+            self.updated_at[resume_id] = resume.get("corpusUpdatedAt")
+            self.ids.append(resume["_id"])
+            self.emails.append(resume["email"])
+            # Bulk-ingested resumes share the recruiter's email but are different candidates
+            candidate_keys.append(resume.get("candidateId") or resume["email"])
+            self.urls.append(resume.get("resumeUrl"))
+            skills.append(set(resume["resumeSkills"]))
+            uploaded_at.append(resume.get("uploadedAt"))
+            term_counts.append(resume["tfidfTerms"])
+        if not vectors:
+            return
+
+        start = self.n_rows
+        self.n_rows += len(vectors)
+        self.size += len(vectors)
+        self.skills += skills
+        self.alive = np.concatenate([self.alive, np.ones(len(vectors), dtype=bool)])
+
+        rows, cols = [], []
+        for row, resume_skills in enumerate(skills):
+            for skill in resume_skills:
+                col = self.skill_vocab.get(skill)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+        new_skills = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(len(vectors), len(self.skill_vocab))
+        )
+        self.skill_matrix = sparse.vstack([self.skill_matrix, new_skills], format="csr")
+
+        # New terms widen the vocabulary; the existing rows are re-viewed at the new width, not copied
+        new_tf = counts_matrix(term_counts, self.tfidf_vocab)
+        width = len(self.tfidf_vocab)
+        old_tf = sparse.csr_matrix((self.tf_matrix.data, self.tf_matrix.indices, self.tf_matrix.indptr), shape=(start, width))
+        self.tf_matrix = sparse.vstack([old_tf, new_tf], format="csr")
+        self._tfidf_key = None
+
+        new_vectors = np.vstack(vectors)
+        if self._embeddings.shape[0] < self.n_rows or self._embeddings.shape[1] != new_vectors.shape[1]:
+            grown = np.zeros((max(self.n_rows, 2 * start), new_vectors.shape[1]), dtype=np.float32)
+            if start:
+                grown[:start] = self._embeddings[:start]
+            self._embeddings = grown
+        self._embeddings[start:self.n_rows] = new_vectors
+
+        self.uploaded_at = np.concatenate([self.uploaded_at, np.array(
+            [np.datetime64(d, "ms") if d else np.datetime64("NaT", "ms") for d in uploaded_at], dtype="datetime64[ms]"
+        )])
+        codes = [self.candidate_codes.setdefault(key, len(self.candidate_codes)) for key in candidate_keys]
+        self.email_codes = np.concatenate([self.email_codes, np.asarray(codes, dtype=np.int64)])
+
+    # A new corpus with the given (re-read) resumes replaced or added; this one is left untouched for
+    # queries still running on it. Resumes whose corpusUpdatedAt is unchanged are skipped.
+    def with_changes(self, resumes):
+        changed = [
+            resume for resume in resumes
+            if str(resume["_id"]) not in self.row_of or self.updated_at.get(str(resume["_id"])) != resume.get("corpusUpdatedAt")
+        ]
+        if not changed:
+            return self
+        corpus = copy.copy(self)
+        for name in ("ids", "emails", "urls", "skills"):
+            setattr(corpus, name, list(getattr(self, name)))
+        corpus.row_of = dict(self.row_of)
+        corpus.updated_at = dict(self.updated_at)
+        corpus.tfidf_vocab = dict(self.tfidf_vocab)
+        corpus.candidate_codes = dict(self.candidate_codes)
+        corpus.alive = self.alive.copy()
+        for resume in changed:
+            row = corpus.row_of.pop(str(resume["_id"]), None)
+            if row is not None:
+                corpus.alive[row] = False
+                corpus.size -= 1
+        corpus._append(changed)
+        return corpus
+
+    @property
+    def dead_rows(self):
+        return self.n_rows - self.size
+
+    # IDF per vocabulary column and per-row norms under the current corpus IDF, recomputed only
+    # when the TF-IDF model has changed (a resume was indexed, or it reloaded from Mongo)
+    def tfidf_weights(self):
+        model = get_tfidf_model()
+        key = (model.n_docs, model.loaded_at, len(self.tfidf_vocab))
+        if self._tfidf_key != key:
+            idf = model.idf_vector(self.tfidf_vocab)
+            norms = np.sqrt(self.tf_matrix.multiply(self.tf_matrix) @ (idf ** 2))
+            norms[norms == 0] = 1
+            self._tfidf_weights = (model, idf, norms)
+            self._tfidf_key = key
+        return self._tfidf_weights
+
+    def skill_scores(self, jd_skills, rows):
+        if not jd_skills:
+            return np.zeros(len(rows), dtype=np.float64)
+        jd_mask = np.zeros(len(self.skill_vocab), dtype=np.float32)
+        jd_mask[[self.skill_vocab[s] for s in jd_skills if s in self.skill_vocab]] = 1.0
+        return (self.skill_matrix[rows] @ jd_mask) / len(jd_skills) * 100
+
+    def tfidf_scores(self, jd_text, rows):
+        if not self.tfidf_vocab or not jd_text.strip():
+            return np.zeros(len(rows), dtype=np.float64)
+        model, idf, norms = self.tfidf_weights()
+        # cosine = (counts * idf) . jd_row / row norm, with the IDF folded into the JD side
+        jd_row = model.transform(jd_text, self.tfidf_vocab, idf)
+        query = np.asarray(jd_row.todense()).ravel() * idf
+        return (self.tf_matrix[rows] @ query) / norms[rows] * 100
+
+    def bert_scores(self, jd_vector, rows):
+        if jd_vector is None or not len(rows):
+            return np.zeros(len(rows), dtype=np.float64)
+        return bert_scores(self.embedding_matrix[rows], jd_vector)
+
+    # Hybrid scores for the given corpus rows (all live rows when rows is None)
+    def score(self, jd_text, jd_skills, weights=DEFAULT_WEIGHTS, rows=None, jd_vector=None):
+        rows = self.live_rows() if rows is None else rows
+        if jd_vector is None and jd_text.strip():
+            jd_vector = encode_text(jd_text)
+        components = np.column_stack([
+            self.skill_scores(jd_skills, rows),
+            self.tfidf_scores(jd_text, rows),
+            self.bert_scores(jd_vector, rows),
+        ]).astype(np.float64)
+        hybrid = np.round(components @ np.asarray(weights, dtype=np.float64), 2)
+        return components, hybrid
+
+    # Candidate rows from the ANN index (None = not used for this corpus size)
+    def ann_candidates(self, jd_vector):
+        ann = get_ann_index()
+        if jd_vector is None or not ann.enabled or self.size < ANN_MIN_CORPUS:
+            return None
+        rows = [self.row_of[resume_id] for resume_id in ann.search(jd_vector, ANN_CANDIDATES) if resume_id in self.row_of]
+        return np.asarray(rows, dtype=np.int64)
+
+    # Rows passing the pushed-down filters, so filtered-out resumes are never scored
+    def filter_rows(self, required_skills=None, uploaded_after=None, uploaded_before=None):
+        mask = self.alive.copy()
+        if required_skills:
+            cols = [self.skill_vocab.get(skill) for skill in required_skills]
+            if any(col is None for col in cols):
+                return np.zeros(0, dtype=np.int64)
+            have = np.asarray(self.skill_matrix[:, cols].sum(axis=1)).ravel()
+            mask &= have == len(cols)
+        if uploaded_after is not None:
+            mask &= self.uploaded_at >= np.datetime64(uploaded_after, "ms")
+        if uploaded_before is not None:
+            mask &= self.uploaded_at <= np.datetime64(uploaded_before, "ms")
+        return np.flatnonzero(mask)
+
+    def jd_features(self, jd_text, jd_features=None):
+        if jd_features is None:
+            jd_features = {
+                "skills": self.taxonomy.match(jd_text),
+                "vector": encode_text(jd_text) if jd_text.strip() else None,
+            }
+        return jd_features
+
+    # Indices (into rows/hybrid) of the best resume per email, top-k by hybrid score,
+    # using argpartition instead of a full sort
+    def select_best(self, rows, hybrid, k, min_score=None):
+        keep = np.arange(len(rows)) if min_score is None else np.flatnonzero(hybrid >= min_score)
+        email_codes = self.email_codes[rows[keep]]
+        order = keep[np.lexsort((-hybrid[keep], email_codes))]
+        first_in_group = np.ones(len(order), dtype=bool)
+        first_in_group[1:] = self.email_codes[rows[order]][1:] != self.email_codes[rows[order]][:-1]
+        best = order[first_in_group]
+
+        if len(best) > k:
+            best = best[np.argpartition(-hybrid[best], k - 1)[:k]]
+        return best[np.argsort(-hybrid[best], kind="stable")]
+
+    def result_item(self, row, components, hybrid, jd_skills):
+        return {
+            "resumeId": str(self.ids[row]),
+            "email": self.emails[row],
+            "resumeUrl": self.urls[row],
+            "matchedSkills": sorted(self.skills[row] & jd_skills),
+            "scores": {
+                "skillScore": round(float(components[0]), 2),
+                "tfidfScore": round(float(components[1]), 2),
+                "bertScore": round(float(components[2]), 2),
+                "hybridScore": float(hybrid)
+            }
+        }
+
+    # Two stages: cheap sparse skill + TF-IDF scores over every (filtered) resume, plus ANN neighbours
+    # of the JD, pick `candidates` rows; only those get the full hybrid score with BERT.
+    # candidates=0 re-scores everything. jd_features ({"skills", "vector"}) can be passed in from
+    # query_cache to skip the JD encode. Returns (results, stats with per-stage timings in ms).
+    def top_matches(self, jd_text, k=10, weights=DEFAULT_WEIGHTS, candidates=RERANK_CANDIDATES,
+                    jd_features=None, rows=None, min_score=None):
+        timings = {}
+        clock = time.perf_counter()
+
+        def lap(stage):
+            nonlocal clock
+            now = time.perf_counter()
+            timings[stage] = round((now - clock) * 1000, 2)
+            clock = now
+
+        all_rows = self.live_rows() if rows is None else rows
+        if not len(all_rows):
+            return [], {"corpusSize": self.size, "filteredSize": 0, "candidateCount": 0, "timings": timings}
+
+        jd_features = self.jd_features(jd_text, jd_features)
+        jd_skills = jd_features["skills"]
+        jd_vector = jd_features["vector"]
+        lap("encodeJd")
+
+        # Stage 1: retrieve
+        skill = self.skill_scores(jd_skills, all_rows)
+        tfidf = self.tfidf_scores(jd_text, all_rows)
+        if candidates and candidates < len(all_rows):
+            cheap = weights[0] * skill + weights[1] * tfidf
+            picked = np.argpartition(-cheap, candidates - 1)[:candidates]
+            ann_rows = self.ann_candidates(jd_vector)
+            if ann_rows is not None:
+                picked = np.union1d(picked, np.flatnonzero(np.isin(all_rows, ann_rows)))
+        else:
+            picked = np.arange(len(all_rows))
+        rows = all_rows[picked]
+        lap("retrieve")
+
+        # Stage 2: exact hybrid re-score of the candidates
+        components = np.column_stack([skill[picked], tfidf[picked], self.bert_scores(jd_vector, rows)]).astype(np.float64)
+        hybrid = np.round(components @ np.asarray(weights, dtype=np.float64), 2)
+        lap("rerank")
+
+        best = self.select_best(rows, hybrid, k, min_score)
+        results = [self.result_item(rows[j], components[j], hybrid[j], jd_skills) for j in best]
+        lap("select")
+        return results, {
+            "corpusSize": self.size,
+            "filteredSize": int(len(all_rows)),
+            "candidateCount": int(len(rows)),
+            "timings": timings,
+        }
+
+    # Exact scoring in chunks of rows, yielding (scored, best-so-far results) after every chunk
+    # so a client sees good matches before the whole corpus has been scored
+    def iter_top_matches(self, jd_text, k=10, weights=DEFAULT_WEIGHTS, jd_features=None, rows=None,
+                         min_score=None, chunk_size=STREAM_CHUNK_SIZE):
+        all_rows = self.live_rows() if rows is None else rows
+        jd_features = self.jd_features(jd_text, jd_features)
+        jd_skills = jd_features["skills"]
+        weights = np.asarray(weights, dtype=np.float64)
+
+        pool_rows = np.zeros(0, dtype=np.int64)
+        pool_components = np.zeros((0, 3), dtype=np.float64)
+        pool_hybrid = np.zeros(0, dtype=np.float64)
+        for start in range(0, len(all_rows), chunk_size):
+            chunk = all_rows[start:start + chunk_size]
+            components = np.column_stack([
+                self.skill_scores(jd_skills, chunk),
+                self.tfidf_scores(jd_text, chunk),
+                self.bert_scores(jd_features["vector"], chunk),
+            ]).astype(np.float64)
+            pool_rows = np.concatenate([pool_rows, chunk])
+            pool_components = np.vstack([pool_components, components])
+            pool_hybrid = np.concatenate([pool_hybrid, np.round(components @ weights, 2)])
+
+            # Only the current top-k can still make the final top-k
+            best = self.select_best(pool_rows, pool_hybrid, k, min_score)
+            pool_rows, pool_components, pool_hybrid = pool_rows[best], pool_components[best], pool_hybrid[best]
+            yield min(start + chunk_size, len(all_rows)), [
+                self.result_item(row, comp, score, jd_skills)
+                for row, comp, score in zip(pool_rows, pool_components, pool_hybrid)
+            ]
+
+
+_corpus = None
+_corpus_lock = threading.Lock()
+
+
+# Reuse the built matrices until the corpus version (bumped on resume insert/update) or the taxonomy
+# changes; then read back only the resumes written since the last sync
+def get_resume_corpus():
+    global _corpus
+    taxonomy = get_taxonomy()
+    corpus = _corpus
+    if corpus is not None and corpus.signature == (taxonomy.version, get_corpus_version()):
+        return corpus
+
+    with _corpus_lock:
+        # Read before loading: a write that lands during the load bumps it again and is re-read next time
+        version = get_corpus_version()
+        corpus = _corpus
+        if corpus is not None and corpus.signature == (taxonomy.version, version):
+            return corpus
+        started = datetime.utcnow()
+        if (corpus is not None and corpus.taxonomy.version == taxonomy.version
+                and corpus.dead_rows <= CORPUS_MAX_DEAD_FRACTION * max(corpus.n_rows, 1)):
+            since = corpus.synced_at - timedelta(seconds=CORPUS_SYNC_OVERLAP_SECONDS)
+            changed = list(resume_collection.find({"corpusUpdatedAt": {"$gte": since}}, CORPUS_PROJECTION))
+            corpus = corpus.with_changes(changed)
+        else:
+            corpus = ResumeCorpus(list(resume_collection.find(CORPUS_QUERY, CORPUS_PROJECTION)), taxonomy)
+        corpus.signature = (taxonomy.version, version)
+        corpus.synced_at = started
+        _corpus = corpus
+        return corpus
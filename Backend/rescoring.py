@@ -0,0 +1,66 @@
+import time
+import numpy as np
+from calculation import analysis_result, tfidf_similarity
+from skill_taxonomy import get_taxonomy
+from embeddings import encode_text, bert_scores
+from tfidf_model import get_tfidf_model, term_counts
+from query_cache import get_jd_features
+from ranking import backfill_resume_artifacts
+
+# Re-scoring stored resumes against a new JD.
+# Everything resume-side (text, skills, TF-IDF term counts, embedding) is persisted on the resume
+# document by the first analysis, so a re-score only computes the JD side (cached per normalized JD)
+# plus three similarity products. Resumes from before the artifacts were stored are backfilled once.
+
+RESCORE_PROJECTION = {
+    "email": 1,
+    "resumeUrl": 1,
+    "resumeText": 1,
+    "embedding": 1,
+    "resumeSkills": 1,
+    "skillTaxonomyVersion": 1,
+    "tfidfTerms": 1,
+    "analysisStatus": 1,
+}
+
+
+# Stored resume documents (RESCORE_PROJECTION) + one JD -> one analysis per resume (None where the
+# resume has no usable text), in one batched pass: the JD is encoded once, the TF-IDF and BERT scores
+# are one sparse and one dense product over all resumes, and any missing embeddings are encoded together.
+def rescore_resumes(resumes, jd_text):
+    started = time.perf_counter()
+    taxonomy = get_taxonomy()
+    vectors = backfill_resume_artifacts(resumes, taxonomy)
+    rows = [i for i, vector in enumerate(vectors) if vector is not None]
+    analyses = [None] * len(resumes)
+    if not rows:
+        return analyses, round((time.perf_counter() - started) * 1000, 2)
+
+    jd_features = get_jd_features(jd_text, taxonomy, encode_text)
+    model = get_tfidf_model()
+    if not model.n_docs:
+        tfidf = [tfidf_similarity(resumes[i]["resumeText"], jd_text) for i in rows]
+    elif jd_text.strip():
+        # The JD is a row of the same matrix, so its norm covers every JD term, as in similarity_counts
+        matrix, _ = model.matrix([resumes[i]["tfidfTerms"] for i in rows] + [term_counts(jd_text)])
+        tfidf = np.asarray((matrix[:-1] @ matrix[-1].T).todense()).ravel() * 100
+    else:
+        tfidf = np.zeros(len(rows))
+    if jd_features["vector"] is not None:
+        bert = bert_scores(np.vstack([vectors[i] for i in rows]), jd_features["vector"])
+    else:
+        bert = np.zeros(len(rows))
+
+    for row, i in enumerate(rows):
+        analyses[i] = analysis_result(
+            set(resumes[i]["resumeSkills"]), jd_features["skills"], float(tfidf[row]), float(bert[row])
+        )
+    return analyses, round((time.perf_counter() - started) * 1000, 2)
+
+
+# Single stored resume + JD text -> the same analysis shape as a full upload
+def rescore_resume(resume, jd_text):
+    analyses, elapsed_ms = rescore_resumes([resume], jd_text)
+    if analyses[0] is None:
+        raise Exception("Resume text is not available, please upload it again")
+    return analyses[0], elapsed_ms
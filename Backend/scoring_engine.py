@@ -0,0 +1,136 @@
+import os
+import sys
+import time
+import asyncio
+import multiprocessing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# CPU-bound scoring (skill matching, TF-IDF, BERT) off the request threads.
+#   SCORING_ENGINE=process (default): a pre-warmed process pool, so SCORING_WORKERS resumes are
+#       scored in parallel instead of one at a time under the GIL. The startup pool is forked where
+#       the platform allows, before the parent has served a request, so models preloaded in the parent
+#       (PRELOAD_MODELS) are shared copy-on-write. Any later pool (a replacement for a broken one, or
+#       one first created on demand) is started through forkserver/spawn instead: by then the parent
+#       has run torch inference on many threads, and a forked child can deadlock on the OpenMP/torch
+#       locks it inherits. Those children load the models once in their initializer. Tasks must be picklable top-level
+#       functions that need no parent-only state, and children never touch Mongo: anything that
+#       depends on the live corpus (the TF-IDF score under the corpus IDF) is computed in the parent
+#       and passed in. A pool broken by a crashed child is replaced on the next submit.
+#   SCORING_ENGINE=thread: the same interface on a thread pool (one process, e.g. low-memory hosts).
+# run_local() is for work over parent-only in-memory state (the HR ranking corpus); it runs on a
+# thread pool whose NumPy/SciPy kernels release the GIL, and counts toward the same queue depth.
+# Request handlers submit with shed=True: past SCORING_QUEUE_DEPTH queued + running tasks they get a
+# 429 instead of waiting. Background jobs (analysis queue, bulk ingestion) wait for their turn.
+
+ENGINE = os.getenv("SCORING_ENGINE", "process")
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", str(min(4, os.cpu_count() or 1))))
+SCORING_QUEUE_DEPTH = int(os.getenv("SCORING_QUEUE_DEPTH", str(SCORING_WORKERS * 8)))
+
+
+def _init_worker():
+    # One BLAS/torch thread per child: parallelism comes from the processes
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    import model_registry
+    from skill_taxonomy import get_taxonomy
+    model_registry.warm_up(["bert"])
+    get_taxonomy()
+
+
+def _ping():
+    # Long enough that one child cannot answer every warm-up ping alone
+    time.sleep(0.05)
+    return os.getpid()
+
+
+class ScoringEngine:
+    def __init__(self, mode=ENGINE, workers=SCORING_WORKERS, queue_depth=SCORING_QUEUE_DEPTH):
+        self.mode = mode
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.executor = None
+        self.local_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scoring")
+
+    def _create_executor(self, fork=False):
+        if self.mode != "process":
+            return self.local_executor
+        if sys.platform.startswith("linux"):
+            method = "fork" if fork else "forkserver"
+        else:
+            method = None
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context(method), initializer=_init_worker
+        )
+
+    # Start every child now so the first requests do not pay for process start and model load
+    async def start(self):
+        if self.executor is None:
+            self.executor = self._create_executor(fork=True)
+        if self.mode == "process":
+            loop = asyncio.get_running_loop()
+            pids = await asyncio.gather(*(loop.run_in_executor(self.executor, _ping) for _ in range(self.workers)))
+            print(f"⚙️ Scoring engine ready: {len(set(pids))} processes, queue depth {self.queue_depth}")
+
+    # 429 when `queued` more tasks (e.g. analysis jobs waiting for the engine) would not fit
+    def admit(self, queued=0):
+        if self.pending + queued >= self.queue_depth:
+            self.rejected += 1
+            raise HTTPException(status_code=429, detail="Scoring queue is full, please retry shortly", headers={"Retry-After": "2"})
+
+    async def _run(self, executor, func, args, kwargs, shed):
+        if shed:
+            self.admit()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    async def submit(self, func, *args, shed=True, **kwargs):
+        if self.executor is None:
+            self.executor = self._create_executor()
+        executor = self.executor
+        try:
+            return await self._run(executor, func, args, kwargs, shed)
+        except BrokenProcessPool:
+            # A child died (crash, OOM kill): this task fails, later ones get a fresh pool
+            if self.executor is executor:
+                print("⚠️ Scoring process pool broken, starting a new one")
+                executor.shutdown(wait=False)
+                self.executor = self._create_executor()
+            raise
+
+    async def run_local(self, func, *args, shed=True, **kwargs):
+        return await self._run(self.local_executor, func, args, kwargs, shed)
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "queueDepth": self.queue_depth,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        if self.executor is not None and self.executor is not self.local_executor:
+            self.executor.shutdown(wait=False)
+        self.local_executor.shutdown(wait=False)
+
+
+engine = ScoringEngine()
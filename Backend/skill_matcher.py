@@ -0,0 +1,70 @@
+import re
+
+# Dictionary-based skill matcher used by calculation.extract_skills.
+# Skills and resume text go through the same tokenizer, which keeps "c++", "c#", "node.js" and ".net"
+# as single tokens and treats hyphens/slashes as separators (so "problem-solving" matches
+# "problem solving"). Skill phrases are stored in a token trie and the text is scanned once,
+# taking the longest phrase at each position - no spaCy pipeline involved.
+
+TOKEN_PATTERN = re.compile(r"(?<![\w.+#])\.?[a-z0-9](?:[a-z0-9+#.]*[a-z0-9+#])?")
+
+_TERMINAL = "\0"
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class SkillMatcher:
+    # `skills` maps canonical skill name -> iterable of aliases (the name itself is always matched)
+    def __init__(self, skills):
+        self.trie = {}
+        self.size = 0
+        for canonical, aliases in skills.items():
+            for phrase in {canonical, *aliases}:
+                self.add(phrase, canonical)
+
+    def add(self, phrase, canonical):
+        tokens = tokenize(phrase)
+        if not tokens:
+            return
+        node = self.trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node[_TERMINAL] = canonical
+        self.size += 1
+
+    def match(self, text):
+        tokens = tokenize(text)
+        found = set()
+        i = 0
+        while i < len(tokens):
+            node = self.trie
+            longest_end, longest_skill = i, None
+            j = i
+            while j < len(tokens):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                if _TERMINAL in node:
+                    longest_end, longest_skill = j, node[_TERMINAL]
+            if longest_skill is not None:
+                found.add(longest_skill)
+                i = longest_end
+            else:
+                i += 1
+        return found
+
+
+_matchers = {}
+
+
+# One compiled matcher per distinct keyword set
+def get_skill_matcher(skill_keywords):
+    key = frozenset(skill_keywords)
+    matcher = _matchers.get(key)
+    if matcher is None:
+        matcher = SkillMatcher({skill: () for skill in key})
+        _matchers[key] = matcher
+    return matcher
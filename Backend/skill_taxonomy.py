@@ -0,0 +1,94 @@
+import os
+import json
+import time
+import threading
+from dotenv import load_dotenv
+from skill_matcher import SkillMatcher
+
+load_dotenv()
+
+# Versioned skill taxonomy (canonical names, categories, aliases) compiled into a SkillMatcher.
+#   SKILL_TAXONOMY_SOURCE=file (default) reads SKILL_TAXONOMY_PATH (skill_taxonomy.json)
+#   SKILL_TAXONOMY_SOURCE=mongo reads the skill_taxonomy collection, version from its {_id: "__version__"} doc
+# Every SKILL_TAXONOMY_CHECK_SECONDS the source version is checked and, if it changed, a new index is
+# compiled and swapped in - workers pick up taxonomy edits without a restart. Resumes store the
+# taxonomy version their skills were extracted with, so only skills (not embeddings) are recomputed.
+
+SOURCE = os.getenv("SKILL_TAXONOMY_SOURCE", "file")
+PATH = os.getenv("SKILL_TAXONOMY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "skill_taxonomy.json"))
+CHECK_SECONDS = float(os.getenv("SKILL_TAXONOMY_CHECK_SECONDS", "30"))
+
+
+class SkillTaxonomy:
+    def __init__(self, version, skills):
+        self.version = version
+        self.categories = {s["name"]: s.get("category", "other") for s in skills}
+        self.skill_names = frozenset(self.categories)
+        self.matcher = SkillMatcher({s["name"]: s.get("aliases", []) for s in skills})
+
+    def match(self, text):
+        return self.matcher.match(text)
+
+    def by_category(self, skills):
+        grouped = {}
+        for skill in sorted(skills):
+            grouped.setdefault(self.categories.get(skill, "other"), []).append(skill)
+        return grouped
+
+
+def _file_version():
+    # mtime lets us skip re-reading an unchanged file; the version string inside is what gets recorded
+    return os.path.getmtime(PATH)
+
+
+def _load_file():
+    with open(PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    return SkillTaxonomy(data["version"], data["skills"])
+
+
+def _mongo_collection():
+    from database import db
+    return db.skill_taxonomy
+
+
+def _mongo_version():
+    meta = _mongo_collection().find_one({"_id": "__version__"}) or {}
+    return meta.get("version")
+
+
+def _load_mongo():
+    collection = _mongo_collection()
+    version = _mongo_version()
+    skills = list(collection.find({"_id": {"$ne": "__version__"}}, {"_id": 0, "name": 1, "category": 1, "aliases": 1}))
+    return SkillTaxonomy(version, skills)
+
+
+_taxonomy = None
+_source_stamp = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def reload(force=False):
+    global _taxonomy, _source_stamp, _checked_at
+    with _lock:
+        stamp = _mongo_version() if SOURCE == "mongo" else _file_version()
+        _checked_at = time.time()
+        if not force and _taxonomy is not None and stamp == _source_stamp:
+            return _taxonomy
+        taxonomy = _load_mongo() if SOURCE == "mongo" else _load_file()
+        _taxonomy, _source_stamp = taxonomy, stamp
+        print(f"📚 Loaded skill taxonomy {taxonomy.version} ({len(taxonomy.skill_names)} skills, {taxonomy.matcher.size} phrases)")
+        return _taxonomy
+
+
+def get_taxonomy():
+    if _taxonomy is None or time.time() - _checked_at > CHECK_SECONDS:
+        try:
+            return reload()
+        except Exception as e:
+            if _taxonomy is None:
+                raise
+            print(f"⚠️ Skill taxonomy reload failed, keeping {_taxonomy.version}: {e}")
+    return _taxonomy
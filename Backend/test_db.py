@@ -3,8 +3,10 @@
 Test script to verify database connection and basic operations
 """
 
-from database import client, collection, resume_collection
+from database import client, collection, resume_collection, ensure_indexes
+from getData import find_resumes_for_email
 from bson import ObjectId
+from datetime import datetime, timedelta
 
 def test_database_connection():
     """Test if we can connect to MongoDB"""
@@ -26,6 +28,45 @@ def test_database_connection():
         print(f"❌ Database connection failed: {e}")
         return False
 
+def plan_stages(plan):
+    """Flatten a query plan tree into its stage names"""
+    stages = [plan.get("stage")]
+    for child in plan.get("inputStages", []) + [plan.get("inputStage")]:
+        if child:
+            stages += plan_stages(child)
+    return stages
+
+def check_plan(name, explain, index_name):
+    """An indexed plan: the expected IXSCAN, no collection scan, no in-memory SORT"""
+    winning = explain["queryPlanner"]["winningPlan"]
+    stages = plan_stages(winning)
+    stats = explain.get("executionStats", {})
+    ok = "IXSCAN" in stages and "COLLSCAN" not in stages and "SORT" not in stages and index_name in str(winning)
+    print(f"{'✅' if ok else '❌'} {name}: {' <- '.join(s for s in stages if s)} "
+          f"(keys examined {stats.get('totalKeysExamined')}, docs examined {stats.get('totalDocsExamined')})")
+    return ok
+
+def test_query_plans():
+    """Listing and login queries must be served by the declared indexes"""
+    try:
+        ensure_indexes()
+        sample = resume_collection.find_one({}, {"email": 1}) or {"email": "nobody@example.com"}
+        listing = find_resumes_for_email(sample["email"]).explain()
+        login = collection.find({"email": sample["email"]}).limit(1).explain()
+        corpus_sync = resume_collection.find({"corpusUpdatedAt": {"$gte": datetime.utcnow() - timedelta(minutes=1)}}).explain()
+        results = [
+            check_plan("Resume listing by email, sorted by hybridScore", listing, "email_hybridScore_id"),
+            check_plan("User lookup by email", login, "email_unique"),
+            check_plan("HR corpus sync of recently changed resumes", corpus_sync, "corpusUpdatedAt"),
+        ]
+        return all(results)
+
+    except Exception as e:
+        print(f"❌ Query plan check failed: {e}")
+        return False
+
 if __name__ == "__main__":
     print("🔍 Testing database connection...")
-    test_database_connection() 
\ No newline at end of file
+    if test_database_connection():
+        print("🔍 Checking query plans...")
+        test_query_plans()
@@ -0,0 +1,163 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Extracted-text cache for calculation.extract_text_from_url.
+#   - texts are content-addressed (sha256 of the PDF bytes), so the same file behind two URLs is parsed once
+#   - each URL remembers its ETag and content hash; within TEXT_CACHE_URL_TTL seconds the text is served
+#     without touching the network, after that a conditional GET (If-None-Match) revalidates it
+#   - an in-process LRU bounded by entry count and total characters, plus an optional Mongo tier
+#     (TEXT_CACHE_BACKEND=mongo) shared by all workers and surviving restarts
+
+MAX_ENTRIES = int(os.getenv("TEXT_CACHE_MAX_ENTRIES", "256"))
+MAX_CHARS = int(os.getenv("TEXT_CACHE_MAX_CHARS", str(20_000_000)))
+URL_TTL = float(os.getenv("TEXT_CACHE_URL_TTL", "3600"))
+BACKEND = os.getenv("TEXT_CACHE_BACKEND", "memory")
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class LRUTextCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_chars=MAX_CHARS):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._entries = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+            return text
+
+    def put(self, key, text):
+        if len(text) > self.max_chars:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._chars -= len(self._entries.pop(key))
+            self._entries[key] = text
+            self._chars += len(text)
+            while len(self._entries) > self.max_entries or self._chars > self.max_chars:
+                _, evicted = self._entries.popitem(last=False)
+                self._chars -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+
+
+# url -> {"etag", "contentHash", "fetchedAt"}; small, so only bounded by entry count
+_url_index = OrderedDict()
+_url_lock = threading.Lock()
+_texts = LRUTextCache()
+
+
+def _mongo_collection():
+    if BACKEND != "mongo":
+        return None
+    from database import db
+    return db.text_cache
+
+
+def _get_url_entry(url):
+    with _url_lock:
+        entry = _url_index.get(url)
+        if entry is not None:
+            _url_index.move_to_end(url)
+            return entry
+    collection = _mongo_collection()
+    if collection is not None:
+        doc = collection.find_one({"_id": f"url:{url}"})
+        if doc:
+            entry = {"etag": doc.get("etag"), "contentHash": doc["contentHash"], "fetchedAt": doc["fetchedAt"]}
+            _put_url_entry(url, entry)
+            return entry
+    return None
+
+
+def _put_url_entry(url, entry):
+    with _url_lock:
+        _url_index[url] = entry
+        _url_index.move_to_end(url)
+        while len(_url_index) > MAX_ENTRIES * 4:
+            _url_index.popitem(last=False)
+
+
+def get_by_hash(digest):
+    text = _texts.get(digest)
+    if text is not None:
+        return text
+    collection = _mongo_collection()
+    if collection is not None:
+        doc = collection.find_one({"_id": f"sha256:{digest}"})
+        if doc:
+            _texts.put(digest, doc["text"])
+            return doc["text"]
+    return None
+
+
+# Text for a URL fetched within the TTL, without any network access
+def lookup_fresh(url):
+    entry = _get_url_entry(url)
+    if entry is None or time.time() - entry["fetchedAt"] > URL_TTL:
+        return None
+    return get_by_hash(entry["contentHash"])
+
+
+# Headers for a conditional GET when we already hold this URL's text
+def conditional_headers(url):
+    entry = _get_url_entry(url)
+    if entry and entry.get("etag") and get_by_hash(entry["contentHash"]) is not None:
+        return {"If-None-Match": entry["etag"]}
+    return {}
+
+
+# Server answered 304 Not Modified: refresh the URL entry and return the cached text
+def revalidated(url):
+    entry = _get_url_entry(url)
+    if entry is None:
+        return None
+    text = get_by_hash(entry["contentHash"])
+    if text is not None:
+        store(url, entry["contentHash"], text, entry.get("etag"))
+    return text
+
+
+def store(url, digest, text, etag=None):
+    entry = {"etag": etag, "contentHash": digest, "fetchedAt": time.time()}
+    _put_url_entry(url, entry)
+    store_text(digest, text)
+    collection = _mongo_collection()
+    if collection is not None:
+        try:
+            collection.update_one({"_id": f"url:{url}"}, {"$set": entry}, upsert=True)
+        except Exception as e:
+            print(f"⚠️ Could not persist extracted text for {url}: {e}")
+
+
+# Text for content that did not come from a URL (an uploaded file)
+def store_text(digest, text):
+    _texts.put(digest, text)
+    collection = _mongo_collection()
+    if collection is not None:
+        try:
+            collection.update_one({"_id": f"sha256:{digest}"}, {"$set": {"text": text}}, upsert=True)
+        except Exception as e:
+            print(f"⚠️ Could not persist extracted text {digest}: {e}")
+
+
+def clear():
+    with _url_lock:
+        _url_index.clear()
+    _texts.clear()
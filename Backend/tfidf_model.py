@@ -0,0 +1,199 @@
+import os
+import math
+import time
+import threading
+from collections import Counter
+import numpy as np
+from scipy import sparse
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+from database import db, resume_collection, get_corpus_version
+
+load_dotenv()
+
+# Corpus-level TF-IDF model.
+# Document frequencies over all stored resumes live in Mongo (tfidf_df: {_id: term, df}, tfidf_meta: nDocs)
+# and are updated incrementally as resumes are uploaded. Each resume stores its raw term counts
+# ("tfidfTerms"), so its vector can be re-weighted with the current IDF at query time, and a JD is
+# only ever transformed, never fitted.
+# Other processes' document frequency changes are picked up through the corpus version counter that
+# every resume write bumps: it is checked every TFIDF_REFRESH_SECONDS, and only when it moved is the
+# df table reloaded, on a background thread (requests keep the loaded model meanwhile).
+
+REFRESH_SECONDS = float(os.getenv("TFIDF_REFRESH_SECONDS", "10"))
+
+df_collection = db.tfidf_df
+meta_collection = db.tfidf_meta
+
+_analyzer = None
+
+
+# Same tokenisation as sklearn's TfidfVectorizer defaults (lowercase, \b\w\w+\b)
+def analyze(text):
+    global _analyzer
+    if _analyzer is None:
+        from sklearn.feature_extraction.text import CountVectorizer
+        _analyzer = CountVectorizer().build_analyzer()
+    return _analyzer(text)
+
+
+def term_counts(text):
+    return dict(Counter(analyze(text)))
+
+
+class TfidfCorpusModel:
+    def __init__(self):
+        self.df = {}
+        self.n_docs = 0
+        self.version = None
+        self.loaded_at = 0.0
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def load(self):
+        # Version first: a write landing during the load is picked up by the next refresh
+        version = get_corpus_version()
+        meta = meta_collection.find_one({"_id": "corpus"}) or {}
+        df = {doc["_id"]: doc["df"] for doc in df_collection.find({}, {"df": 1})}
+        with self._lock:
+            self.df = df
+            self.n_docs = meta.get("nDocs", 0)
+            self.version = version
+            self.loaded_at = self.checked_at = time.time()
+
+    def refresh_if_stale(self):
+        if self.version is None:
+            # First use: everyone waits for the one initial load
+            with self._refresh_lock:
+                if self.version is None:
+                    self.load()
+            return
+        if time.time() - self.checked_at < REFRESH_SECONDS:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        self.checked_at = time.time()
+        threading.Thread(target=self._refresh, daemon=True).start()
+
+    def _refresh(self):
+        try:
+            if get_corpus_version() != self.version:
+                self.load()
+        except Exception as e:
+            print(f"⚠️ TF-IDF model refresh failed: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    # sklearn's smoothed IDF: ln((1 + n) / (1 + df)) + 1
+    def idf(self, term):
+        return math.log((1 + self.n_docs) / (1 + self.df.get(term, 0))) + 1
+
+    def idf_vector(self, vocab):
+        terms = sorted(vocab, key=vocab.get)
+        df = np.fromiter((self.df.get(t, 0) for t in terms), dtype=np.float64, count=len(terms))
+        return np.log((1 + self.n_docs) / (1 + df)) + 1
+
+    # Record one new document's terms (each term counted once per document)
+    def add_document(self, counts):
+        self.add_documents([counts])
+
+    # One round trip for a whole batch: per-term df increments are summed before the bulk write
+    def add_documents(self, counts_list):
+        increments = Counter()
+        for counts in counts_list:
+            increments.update(counts.keys())
+        if increments:
+            df_collection.bulk_write(
+                [UpdateOne({"_id": term}, {"$inc": {"df": n}}, upsert=True) for term, n in increments.items()],
+                ordered=False,
+            )
+        if counts_list:
+            meta_collection.update_one({"_id": "corpus"}, {"$inc": {"nDocs": len(counts_list)}}, upsert=True)
+        with self._lock:
+            for term, n in increments.items():
+                self.df[term] = self.df.get(term, 0) + n
+            self.n_docs += len(counts_list)
+
+    def weighted(self, counts):
+        weights = {term: count * self.idf(term) for term, count in counts.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        return {term: w / norm for term, w in weights.items()} if norm else {}
+
+    # Cosine similarity of two texts under the corpus IDF
+    def similarity(self, text1, text2):
+        return self.similarity_counts(term_counts(text1), term_counts(text2))
+
+    # Same, from term counts already in hand (a resume's stored tfidfTerms)
+    def similarity_counts(self, counts1, counts2):
+        v1 = self.weighted(counts1)
+        v2 = self.weighted(counts2)
+        if len(v1) > len(v2):
+            v1, v2 = v2, v1
+        return sum(w * v2.get(term, 0.0) for term, w in v1.items())
+
+    # L2-normalised N x V matrix from stored term counts, plus the column vocabulary
+    def matrix(self, counts_list):
+        vocab = {}
+        tf = counts_matrix(counts_list, vocab)
+        return self._weight(tf, vocab), vocab
+
+    # transform-only path for a JD: terms outside the vocabulary cannot match any resume, so they get
+    # no column, but they still count toward the JD's norm (as in similarity_counts).
+    # idf: idf_vector(vocab), when the caller already holds it
+    def transform(self, text, vocab, idf=None):
+        counts = term_counts(text)
+        cols = [vocab[t] for t in counts if t in vocab]
+        data = [counts[t] for t in counts if t in vocab]
+        tf = sparse.csr_matrix((data, ([0] * len(cols), cols)), shape=(1, len(vocab)), dtype=np.float64)
+        if not vocab:
+            return tf
+        weighted = tf @ sparse.diags(self.idf_vector(vocab) if idf is None else idf)
+        oov_norm_sq = sum((count * self.idf(term)) ** 2 for term, count in counts.items() if term not in vocab)
+        norm = math.sqrt(weighted.multiply(weighted).sum() + oov_norm_sq)
+        return weighted / norm if norm else weighted
+
+    def _weight(self, tf, vocab):
+        if not vocab:
+            return tf
+        return _l2_normalize(tf @ sparse.diags(self.idf_vector(vocab)))
+
+
+# Raw term-count rows; terms new to `vocab` are added to it (columns in first-seen order)
+def counts_matrix(counts_list, vocab):
+    rows, cols, data = [], [], []
+    for row, counts in enumerate(counts_list):
+        for term, count in counts.items():
+            col = vocab.setdefault(term, len(vocab))
+            rows.append(row)
+            cols.append(col)
+            data.append(count)
+    return sparse.csr_matrix((data, (rows, cols)), shape=(len(counts_list), len(vocab)), dtype=np.float64)
+
+
+def _l2_normalize(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+_model = TfidfCorpusModel()
+
+
+def get_tfidf_model():
+    _model.refresh_if_stale()
+    return _model
+
+
+# Store a resume's term counts and add it to the document frequencies exactly once
+def index_resume(resume_id, resume_text):
+    counts = term_counts(resume_text)
+    result = resume_collection.update_one(
+        {"_id": resume_id, "tfidfCounted": {"$ne": True}},
+        {"$set": {"tfidfTerms": counts, "tfidfCounted": True}},
+    )
+    if result.modified_count:
+        get_tfidf_model().add_document(counts)
+    else:
+        resume_collection.update_one({"_id": resume_id}, {"$set": {"tfidfTerms": counts}})
+    return counts
@@ -1,15 +1,56 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
-from typing import Optional
+from typing import Optional, List
 from bson import ObjectId
 from datetime import datetime
-from database import resume_collection
+from io import BytesIO
+import os
+import asyncio
+from database import bump_corpus_version, get_async_db
 from utils import upload_pdf_to_cloudinary
-from calculation import analyze_resume_against_jd
+from calculation import analyze_resume_text_against_jd, empty_analysis, extract_text_from_url, MAX_PDF_BYTES
 from ai_feedback import generate_feedback
 from auth_utils import get_current_user
+from workers import run_io_bound
+from scoring_engine import engine as scoring_engine
+import analysis_jobs
+import bulk_ingest
+import rescoring
 
 router = APIRouter()
 
+CLOUDINARY_UPLOAD_ATTEMPTS = int(os.getenv("CLOUDINARY_UPLOAD_ATTEMPTS", "3"))
+
+_background_uploads = set()
+
+
+# Push an uploaded PDF to Cloudinary off the request path and record its URL when done.
+# resumeUrl stays null until then; after CLOUDINARY_UPLOAD_ATTEMPTS failures the resume is marked failed.
+async def upload_to_cloudinary(resume_id, pdf_bytes):
+    for attempt in range(1, CLOUDINARY_UPLOAD_ATTEMPTS + 1):
+        try:
+            print("📤 Uploading to Cloudinary...")
+            resume_url = await run_io_bound(upload_pdf_to_cloudinary, BytesIO(pdf_bytes))
+            await get_async_db().resumes.update_one(
+                {"_id": resume_id}, {"$set": {"resumeUrl": resume_url, "corpusUpdatedAt": datetime.utcnow()}}
+            )
+            await run_io_bound(bump_corpus_version)
+            print("✅ Uploaded to:", resume_url)
+            return
+        except Exception as e:
+            print(f"❌ Background upload attempt {attempt} failed for {resume_id}: {e}")
+            error = e
+            if attempt < CLOUDINARY_UPLOAD_ATTEMPTS:
+                await asyncio.sleep(2 ** attempt)
+    await run_io_bound(analysis_jobs.mark_upload_failed, resume_id, error)
+
+
+def start_background_upload(resume_id, pdf_bytes):
+    # Keep a reference so the task is not garbage collected before it finishes
+    task = asyncio.create_task(upload_to_cloudinary(resume_id, pdf_bytes))
+    _background_uploads.add(task)
+    task.add_done_callback(_background_uploads.discard)
+
+
 @router.post("/upload-resume-analyze")
 async def upload_and_analyze_resume(
     file: Optional[UploadFile] = File(None),
@@ -23,16 +64,19 @@ async def upload_and_analyze_resume(
 
     if not file and not drive_url:
         raise HTTPException(status_code=400, detail="Please upload a resume or provide a Google Drive link.")
+    # Back-pressure before the PDF is read: queued jobs hold their bytes in memory until they run
+    scoring_engine.admit(queued=analysis_jobs.queue_size())
 
     try:
-        # Determine which URL to analyze (Cloudinary or Google Drive)
-        resume_url = ""
+        # Uploaded files are analyzed from the bytes in hand; Cloudinary upload runs alongside
+        resume_url = None
+        pdf_bytes = None
         if file:
             if file.content_type != "application/pdf":
                 raise HTTPException(status_code=400, detail="Only PDF files are supported.")
-            print("📤 Uploading to Cloudinary...")
-            resume_url = upload_pdf_to_cloudinary(file.file)
-            print("✅ Uploaded to:", resume_url)
+            pdf_bytes = await file.read()
+            if len(pdf_bytes) > MAX_PDF_BYTES:
+                raise HTTPException(status_code=400, detail=f"PDF must be at most {MAX_PDF_BYTES // (1024 * 1024)} MB.")
         else:
             resume_url = drive_url.strip()
             print("✅ Using provided Google Drive link:", resume_url)
@@ -40,7 +84,7 @@ async def upload_and_analyze_resume(
         # ✅ Store both Cloudinary and Drive URLs regardless
         resume_doc = {
             "email": user["email"],
-            "resumeUrl": resume_url,  # This is used for analysis
+            "resumeUrl": resume_url,  # Cloudinary URL is filled in once the background upload finishes
             "driveUrl": drive_url.strip() if drive_url else "NULL",  # Always store driveUrl if present
             "aiFeedback": "",
             "scores": {
@@ -50,53 +94,129 @@ async def upload_and_analyze_resume(
                 "hybridScore": None,
             },
             "uploadedAt": datetime.utcnow(),
+            "jdText": jd_text,
+            "analysisStatus": analysis_jobs.STATUS_PENDING,
         }
 
-        result = resume_collection.insert_one(resume_doc)
+        result = await get_async_db().resumes.insert_one(resume_doc)
         resume_id = str(result.inserted_id)
+        await run_io_bound(bump_corpus_version)
 
-        # Perform analysis
-        analysis = analyze_resume_against_jd(resume_url=resume_url, jd_text=jd_text)
-        resume_text = analysis.get("resumeText", "")
-
-        feedback = generate_feedback(
-            resume_text=resume_text,
-            analysis_results=analysis
-        )
-
-        analysis["aiFeedback"] = feedback
-
-        # Update document with scores and feedback
-        resume_collection.update_one(
-            {"_id": ObjectId(resume_id)},
-            {
-                "$set": {
-                    "scores.skillScore": analysis["skillScore"],
-                    "scores.tfidfScore": analysis["tfidfScore"],
-                    "scores.bertScore": analysis["bertScore"],
-                    "scores.hybridScore": analysis["hybridScore"],
-                    "aiFeedback": feedback,
-                }
-            },
-        )
+        # Analysis runs in the background; poll /resume/analysis-status/{resumeId} for the result
+        analysis_jobs.enqueue(resume_id, pdf_bytes)
+        if pdf_bytes is not None:
+            start_background_upload(result.inserted_id, pdf_bytes)
 
         return {
-            "message": "Resume uploaded and analyzed successfully",
+            "message": "Resume uploaded, analysis queued",
             "resumeId": resume_id,
             "resumeUrl": resume_url,
             "driveUrl": drive_url.strip() if drive_url else "",
-            **analysis
+            "status": analysis_jobs.STATUS_PENDING
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print("❌ Error during resume analysis:", str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/bulk-upload")
+async def bulk_upload_resumes(
+    files: List[UploadFile] = File(...),
+    jd_text: str = Form(...),
+    user=Depends(get_current_user),
+):
+    if len(files) > bulk_ingest.BULK_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {bulk_ingest.BULK_MAX_FILES} files per request.")
+
+    print(f"📦 Bulk upload of {len(files)} resumes from {user['email']}")
+    try:
+        items = []
+        # Batches bound how many PDFs are held in memory at once
+        for start in range(0, len(files), bulk_ingest.BULK_BATCH_SIZE):
+            batch = [(f.filename, await f.read()) for f in files[start:start + bulk_ingest.BULK_BATCH_SIZE]]
+            items += await bulk_ingest.ingest_batch(batch, user["email"], jd_text)
+        return {"message": "Bulk upload processed", **bulk_ingest.summarize(items)}
+
+    except Exception as e:
+        print("❌ Error during bulk upload:", str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analysis-status/{resume_id}")
+async def get_analysis_status(resume_id: str, user=Depends(get_current_user)):
+    if not ObjectId.is_valid(resume_id):
+        raise HTTPException(status_code=400, detail="Invalid resume id.")
+
+    doc = await get_async_db().resumes.find_one(
+        {"_id": ObjectId(resume_id), "email": user["email"]},
+        {"resumeText": 0, "embedding": 0, "jdText": 0},
+    )
+    if not doc:
+        raise HTTPException(status_code=404, detail="Resume not found.")
+
+    return analysis_jobs.serialize_job(doc)
+
+
+@router.post("/rescore/{resume_id}")
+async def rescore_resume_against_jd(
+    resume_id: str,
+    jd_text: str = Form(...),
+    save: bool = Form(True),
+    user=Depends(get_current_user),
+):
+    if not ObjectId.is_valid(resume_id):
+        raise HTTPException(status_code=400, detail="Invalid resume id.")
+
+    resume = await get_async_db().resumes.find_one(
+        {"_id": ObjectId(resume_id), "email": user["email"]}, rescoring.RESCORE_PROJECTION
+    )
+    if not resume:
+        raise HTTPException(status_code=404, detail="Resume not found.")
+    if resume.get("analysisStatus") in (analysis_jobs.STATUS_PENDING, analysis_jobs.STATUS_RUNNING):
+        raise HTTPException(status_code=409, detail="Resume analysis is still in progress.")
+
+    try:
+        # Only the JD side is computed; the resume's text, skills, term counts and embedding are stored
+        analysis, elapsed_ms = await scoring_engine.run_local(rescoring.rescore_resume, resume, jd_text)
+        feedback = generate_feedback(resume_text=resume["resumeText"], analysis_results=analysis)
+
+        # save=False previews the score without replacing the resume's stored JD and analysis
+        if save:
+            await get_async_db().resumes.update_one({"_id": resume["_id"]}, {"$set": {
+                "jdText": jd_text,
+                "scores.skillScore": analysis["skillScore"],
+                "scores.tfidfScore": analysis["tfidfScore"],
+                "scores.bertScore": analysis["bertScore"],
+                "scores.hybridScore": analysis["hybridScore"],
+                "jdSkills": analysis["jdSkills"],
+                "matchedSkills": analysis["matchedSkills"],
+                "missingSkills": analysis["missingSkills"],
+                "aiFeedback": feedback,
+                "rescoredAt": datetime.utcnow(),
+            }})
+
+        return {
+            "message": "Resume re-scored against the job description",
+            "resumeId": resume_id,
+            "resumeUrl": resume.get("resumeUrl"),
+            **analysis,
+            "aiFeedback": feedback,
+            "saved": save,
+            "elapsedMs": elapsed_ms,
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error re-scoring resume {resume_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/guest-analyze")
-def analyze_guest_resume():
+async def analyze_guest_resume():
     try:
         resume_url = "https://res.cloudinary.com/dloh7csm6/raw/upload/v1752328644/bbaexcathzjznjeixvo5.pdf"
 
@@ -109,9 +229,17 @@ def analyze_guest_resume():
         algorithms, and cloud platforms (e.g., AWS) is a plus. Strong problem-solving skills and the ability to work in cross-functional teams are essential.
         """
 
-        # 4. Analyze using Cloudinary URL
-        analysis = analyze_resume_against_jd(resume_url=resume_url, jd_text=jd_text)
-        resume_text = analysis.get("resumeText", "")  # Ensure for feedback
+        # 4. Analyze using Cloudinary URL: download here, score on the scoring engine
+        try:
+            resume_text = await run_io_bound(extract_text_from_url, resume_url)
+        except Exception as e:
+            print(f"❌ Error in resume analysis: {str(e)}")
+            resume_text = ""
+        if resume_text:
+            tfidf_score = (await run_io_bound(analysis_jobs.tfidf_scores_for, [resume_text], jd_text))[0]
+            analysis = await scoring_engine.submit(analyze_resume_text_against_jd, resume_text, jd_text, tfidf_score=tfidf_score)
+        else:
+            analysis = empty_analysis()
 
         # 5. Generate AI feedback
         feedback = generate_feedback(
@@ -126,5 +254,7 @@ def analyze_guest_resume():
             **analysis
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing guest resume: {str(e)}")
\ No newline at end of file
@@ -14,15 +14,19 @@ UPLOAD_PRESET = "resume_upload"  # ✅ your unsigned preset
 
 cloudinary.config(cloud_name=CLOUD_NAME)
 
-# JWT Token Generator
-def generate_token(user_id: str):
+# Use a default secret key if not provided in environment
+JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key-here-change-in-production")
+
+# JWT Token Generator; email/fullName claims let authenticated requests skip the user lookup
+def generate_token(user_id: str, email: str = None, full_name: str = None):
     payload = {
         "user_id": user_id,
         "exp": datetime.utcnow() + timedelta(days=7)
     }
-    # Use a default secret key if not provided in environment
-    secret_key = os.getenv("JWT_SECRET", "your-secret-key-here-change-in-production")
-    return jwt.encode(payload, secret_key, algorithm="HS256")
+    if email and full_name:
+        payload["email"] = email
+        payload["fullName"] = full_name
+    return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
 
 # PDF Upload to Cloudinary (unsigned)
 def upload_pdf_to_cloudinary(file):
@@ -0,0 +1,52 @@
+import os
+import asyncio
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from fastapi.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+from scoring_engine import engine as scoring_engine
+
+load_dotenv()
+
+# Keep blocking work off the event loop.
+#   run_io_bound  -> Starlette's shared thread pool, for blocking clients (Cloudinary, pymongo, requests)
+#   run_cpu_bound -> the scoring engine (scoring_engine.py, a pre-warmed process pool by default) for
+#                    TF-IDF/BERT scoring; background callers wait for a slot instead of getting a 429
+#   run_password_bound -> bcrypt hash/verify; bcrypt releases the GIL, so one thread per core
+#                    scales logins with cores, and a login burst cannot block scoring or I/O
+#   run_process_bound -> a process pool (created on first use) for GIL-bound pure-Python work such
+#                    as PDF parsing in bulk ingestion; functions and arguments must be picklable
+
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 1)))
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="password")
+process_executor = None
+
+
+async def run_io_bound(func, *args, **kwargs):
+    return await run_in_threadpool(func, *args, **kwargs)
+
+
+async def run_cpu_bound(func, *args, **kwargs):
+    return await scoring_engine.submit(func, *args, shed=False, **kwargs)
+
+
+async def run_password_bound(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, partial(func, *args, **kwargs))
+
+
+async def run_process_bound(func, *args):
+    global process_executor
+    if process_executor is None:
+        process_executor = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(process_executor, func, *args)
+
+
+def shutdown():
+    scoring_engine.shutdown()
+    password_executor.shutdown(wait=False)
+    if process_executor is not None:
+        process_executor.shutdown(wait=False)
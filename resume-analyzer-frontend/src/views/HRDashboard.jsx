@@ -204,14 +204,18 @@ const HRDashboard = () => {
                 )}
 
                 <div style={styles.resumeActions}>
-                  <a
-                    href={resume.resumeUrl}
-                    target="_blank"
-                    rel="noopener noreferrer"
-                    style={styles.viewButton}
-                  >
-                    View Resume
-                  </a>
+                  {resume.resumeUrl ? (
+                    <a
+                      href={resume.resumeUrl}
+                      target="_blank"
+                      rel="noopener noreferrer"
+                      style={styles.viewButton}
+                    >
+                      View Resume
+                    </a>
+                  ) : (
+                    <span style={styles.viewButton}>Resume file still uploading</span>
+                  )}
                 </div>
               </div>
             ))}
@@ -5,6 +5,10 @@ import toast from 'react-hot-toast';
 import { useAuthStore } from '../store/useAuthStore';
 import { Link } from 'react-router-dom';
 
+// Background analysis polling: give up after POLL_TIMEOUT_MS instead of spinning forever
+const POLL_INTERVAL_MS = 1500;
+const POLL_TIMEOUT_MS = 3 * 60 * 1000;
+
 const UploadView = () => {
   const [resumeFile, setResumeFile] = useState(null);
   const [driveUrl, setDriveUrl] = useState('');
@@ -47,8 +51,24 @@ const UploadView = () => {
       const res = await axiosInstance.post('/resume/upload-resume-analyze', formData, {
         headers: { 'Content-Type': 'multipart/form-data' }
       });
+
+      // Analysis runs in the background; poll until it finishes or the deadline passes
+      let status = res.data;
+      const deadline = Date.now() + POLL_TIMEOUT_MS;
+      while (status.status === 'pending' || status.status === 'running') {
+        if (Date.now() > deadline) {
+          return toast.error('Analysis is taking longer than expected. Check your resumes list later.');
+        }
+        await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+        const poll = await axiosInstance.get(`/resume/analysis-status/${res.data.resumeId}`);
+        status = poll.data;
+      }
+      if (status.status === 'failed') {
+        return toast.error(status.error || 'Analysis failed');
+      }
+
       toast.success('Analysis complete!');
-      navigate('/results', { state: res.data });
+      navigate('/results', { state: status });
     } catch (error) {
       toast.error(error?.response?.data?.detail || 'Upload failed');
     } finally {